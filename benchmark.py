@@ -0,0 +1,374 @@
+import argparse
+import csv
+import datetime
+import decimal
+import gzip
+import io
+import json
+import os
+import random
+import subprocess
+import time
+from getpass import getpass
+import dbhandling, metrics, queries
+from dbpool import ConnectionPool, collation_key
+from sqlitepool import DATABASE_PATH, SQLitePool
+
+scales = (1, 10, 100, 1000)
+months = list(dbhandling.month_dict)
+
+
+def format_counter(value: int) -> str:
+    # Same quirk as the export: thousands become "3.9K" or "17K"
+    if value >= 1000:
+        return f"{round(value / 1000, 1):g}K"
+    return str(value)
+
+
+def generate_dataset(path: str, scale: int, seed: int = 0, template: str = "./games.csv") -> int:
+    # Every template row is copied `scale` times with its title suffixed, so duplicate titles inside a copy
+    # keep the proportions of the real export while the counters, dates and reviews are reshuffled
+    rng = random.Random(seed)
+    with open(template, newline="") as file:
+        dataset = csv.reader(file, delimiter=",")
+        header = next(dataset)
+        rows = list(dataset)
+    review_pool = [review for row in rows for review in dbhandling.multivalued_processing(row[9])]
+
+    game_id = 0
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for copy in range(scale):
+            for row in rows:
+                synthetic = list(row)
+                synthetic[0] = str(game_id)
+                if copy:
+                    synthetic[1] = f"{row[1]} ({copy})"
+                if row[2] != "" and row[2][0:3] != "rel":
+                    synthetic[2] = f"{rng.choice(months)} {rng.randint(1, 28):02d}, {rng.randint(1980, 2023)}"
+                if row[4] != "":
+                    synthetic[4] = f"{rng.randint(5, 50) / 10:.1f}"
+                for column in (5, 6, 10, 11, 12, 13):
+                    if row[column] != "":
+                        synthetic[column] = format_counter(int(rng.lognormvariate(6, 1.5)))
+                if row[9] not in ("", "[]"):
+                    count = len(dbhandling.multivalued_processing(row[9]))
+                    synthetic[9] = str(rng.sample(review_pool, count))
+                writer.writerow(synthetic)
+                game_id += 1
+    return game_id
+
+
+def shard_dataset(path: str, shards: int, compression: str = "none") -> str:
+    # Splits a generated dataset into shards that each repeat the header, the way the production exports arrive
+    with open(path, newline="") as file:
+        dataset = csv.reader(file, delimiter=",")
+        header = next(dataset)
+        rows = list(dataset)
+    extension = {"none": "", "gzip": ".gz", "zstd": ".zst"}[compression]
+    stem = path[: -len(".csv")]
+    for shard in range(shards):
+        shard_path = f"{stem}.{shards}-shards.part-{shard:04d}.csv{extension}"
+        if os.path.exists(shard_path):
+            continue
+        text = io.StringIO(newline="")
+        writer = csv.writer(text)
+        writer.writerow(header)
+        writer.writerows(rows[shard * len(rows) // shards : (shard + 1) * len(rows) // shards])
+        data = text.getvalue().encode()
+        if compression == "gzip":
+            data = gzip.compress(data)
+        elif compression == "zstd":
+            import zstandard
+
+            data = zstandard.ZstdCompressor().compress(data)
+        with open(shard_path, "wb") as file:
+            file.write(data)
+    return f"{stem}.{shards}-shards.part-*.csv{extension}"
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_load(
+    pool: ConnectionPool,
+    path: str,
+    batch_size: int,
+    compact: bool = False,
+    compressed_reviews: bool = False,
+    use_mmap: bool = False,
+) -> dict:
+    dbhandling.resetdb(pool)
+    dbhandling.createdb(pool)
+    dbhandling.create_tables(pool, compact, compressed_reviews)
+    start = time.perf_counter()
+    stats = dbhandling.insert_data(pool, path, batch_size=batch_size, use_mmap=use_mmap)
+    stats["wall_seconds"] = time.perf_counter() - start
+    return stats
+
+
+def benchmark_queries(pool: ConnectionPool, runs: int, terms: str = "story") -> dict:
+    results = {}
+    for category in queries.available_categories(pool):
+        if category == "performance":
+            continue
+        for query in queries.queries_inside(category):
+            params = {"terms": terms} if "terms" in queries.query_parameters(category, query) else None
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                queries.fetch_query(pool, category, query, use_cache=False, params=params)
+                samples.append(time.perf_counter() - start)
+            results[f"{category}/{query}"] = {
+                "p50_ms": percentile(samples, 0.50) * 1000,
+                "p95_ms": percentile(samples, 0.95) * 1000,
+                "queries_per_second": runs / sum(samples),
+            }
+    return results
+
+
+def database_size(pool: ConnectionPool) -> float:
+    # information_schema only sees fresh sizes after the statistics are refreshed
+    with pool.connection() as db_conn:
+        with db_conn.cursor() as cursor:
+            if pool.backend == "sqlite":
+                cursor.execute("ANALYZE")
+            else:
+                cursor.execute("SHOW TABLES")
+                tables = [table for (table,) in cursor.fetchall()]
+                cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+                cursor.fetchall()
+    _, rows = queries.fetch_query(pool, "database", "Total database size", use_cache=False)
+    return float(rows[0][1])
+
+
+def compare_schemas(pool: ConnectionPool, path: str, batch_size: int) -> dict:
+    sizes = {}
+    schemas = (("standard", False, False), ("compact", True, False), ("compact with compressed reviews", True, True))
+    for schema, compact, compressed_reviews in schemas:
+        print(f"Loading {path} into the {schema} schema...")
+        benchmark_load(pool, path, batch_size, compact, compressed_reviews)
+        sizes[schema] = database_size(pool)
+        reduction = 1 - sizes[schema] / sizes["standard"]
+        print(f"{schema}: {sizes[schema]:.2f} MB of data and indexes ({reduction:.1%} smaller than standard)")
+    return sizes
+
+
+# The ad-hoc scan the search category replaces, against the same filter through the FULLTEXT index
+search_comparisons = {
+    "videogames.summary": (
+        "SELECT COUNT(*) FROM videogames WHERE summary LIKE %s",
+        "SELECT COUNT(*) FROM videogames WHERE MATCH(summary) AGAINST (%s IN BOOLEAN MODE)",
+    ),
+    "reviews.content": (
+        "SELECT COUNT(*) FROM reviews WHERE content LIKE %s",
+        "SELECT COUNT(*) FROM reviews WHERE MATCH(content) AGAINST (%s IN BOOLEAN MODE)",
+    ),
+}
+
+
+def benchmark_search(pool: ConnectionPool, terms: list, runs: int) -> dict:
+    results = {}
+    with pool.connection() as db_conn:
+        with db_conn.cursor() as cursor:
+            for column, (like_query, fulltext_query) in search_comparisons.items():
+                for term in terms:
+                    timings = {}
+                    for method, sql, value in (("like", like_query, f"%{term}%"), ("fulltext", fulltext_query, term)):
+                        samples = []
+                        for _ in range(runs):
+                            start = time.perf_counter()
+                            cursor.execute(sql, (value,))
+                            matches = cursor.fetchone()[0]
+                            samples.append(time.perf_counter() - start)
+                        timings[f"{method}_p50_ms"] = percentile(samples, 0.50) * 1000
+                        timings[f"{method}_matches"] = matches
+                    # LIKE also matches inside words, so the counts are close but not identical
+                    timings["speedup"] = timings["like_p50_ms"] / timings["fulltext_p50_ms"]
+                    results[f"{column}/{term}"] = timings
+                    print(
+                        f"{column} '{term}': LIKE {timings['like_p50_ms']:.2f} ms ({timings['like_matches']} rows), "
+                        f"FULLTEXT {timings['fulltext_p50_ms']:.2f} ms ({timings['fulltext_matches']} rows), "
+                        f"{timings['speedup']:.1f}x"
+                    )
+    return results
+
+
+def benchmark_browse(pool: ConnectionPool, runs: int, page_size: int = 10) -> dict:
+    # The first page against one near the end of the table, which an OFFSET would have to count up to
+    results = {}
+    for table in queries.browse_tables:
+        browser = queries.TableBrowser(pool, table, page_size=page_size)
+        browser.first()
+        last_keys = queries.TableBrowser(pool, table, descending=True, page_size=page_size + 1).first()[1]
+        if not last_keys:
+            continue
+        boundary = browser.sort_key(last_keys[-1])
+        timings = {}
+        for page, side, keys in (("first", None, ()), ("last", "after", boundary)):
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                browser.fetch(side, keys)
+                samples.append(time.perf_counter() - start)
+            timings[f"{page}_page_p50_ms"] = percentile(samples, 0.50) * 1000
+        results[table] = timings
+        print(f"{table}: first page {timings['first_page_p50_ms']:.2f} ms, last page {timings['last_page_p50_ms']:.2f} ms")
+    return results
+
+
+def comparable(value):
+    # Each engine hands back its own types, and picks its own spelling of a group of names the collation calls equal
+    if isinstance(value, (decimal.Decimal, float)):
+        return round(float(value), 4)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    if isinstance(value, str):
+        return collation_key(value)
+    return value
+
+
+def comparable_rows(rows: list) -> list:
+    return sorted((tuple(comparable(value) for value in row) for row in rows), key=repr)
+
+
+def compare_backends(pools: dict, path: str, batch_size: int, runs: int, compact: bool = False) -> dict:
+    # The database category describes each engine's own catalog, so only the data queries are compared, with the
+    # LIMIT lifted: rows tied on the sort key would otherwise be cut differently by each engine
+    for backend, pool in pools.items():
+        print(f"Loading {path} into {backend}...")
+        benchmark_load(pool, path, batch_size, compact)
+    results = {}
+    for category in queries.query_categories():
+        if category == "database" or category in queries.mysql_only:
+            continue
+        for query in queries.queries_inside(category):
+            params = {"limit": 10**9} if "limit" in queries.query_parameters(category, query) else None
+            timings, answers = {}, {}
+            for backend, pool in pools.items():
+                samples = []
+                for _ in range(runs):
+                    start = time.perf_counter()
+                    _, rows = queries.fetch_query(pool, category, query, use_cache=False, params=params)
+                    samples.append(time.perf_counter() - start)
+                timings[f"{backend}_p50_ms"] = percentile(samples, 0.50) * 1000
+                answers[backend] = comparable_rows(rows)
+            first, *others = answers.values()
+            equivalent = all(answer == first for answer in others)
+            results[f"{category}/{query}"] = {"equivalent": equivalent, "rows": len(first), **timings}
+            print(
+                f"{category}/{query}: {'same' if equivalent else 'DIFFERENT'} {len(first)} row(s), "
+                + ", ".join(f"{backend} {timings[f'{backend}_p50_ms']:.2f} ms" for backend in pools)
+            )
+    different = [query for query, result in results.items() if not result["equivalent"]]
+    print(f"{len(results) - len(different)} of {len(results)} queries return the same rows on every backend.")
+    return results
+
+
+def current_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+    print(f"{old['commit']} -> {new['commit']}")
+    for scale, results in new["scales"].items():
+        if scale not in old["scales"] or "load" not in results or "load" not in old["scales"][scale]:
+            continue
+        before = old["scales"][scale]
+        print(f"\nScale {scale}x")
+        print(f"load: {before['load']['seconds']:.2f}s -> {results['load']['seconds']:.2f}s")
+        for query, timings in results["queries"].items():
+            if query in before["queries"]:
+                ratio = timings["p50_ms"] / before["queries"][query]["p50_ms"]
+                print(f"{query}: p50 {before['queries'][query]['p50_ms']:.2f} -> {timings['p50_ms']:.2f} ms ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the loader and the query catalog (drops popular_videogames).")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--data-dir", default="./benchmark_data")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--metrics", metavar="PATH", help="also write loader and query metrics (.json or .prom)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"])
+    parser.add_argument("--compact", action="store_true", help="load into the schema with integer developer and genre keys")
+    parser.add_argument("--search-terms", nargs="+", default=["story", "multiplayer", "puzzle"])
+    parser.add_argument("--compressed-reviews", action="store_true", help="store reviews in compressed InnoDB pages")
+    parser.add_argument("--compare-schemas", action="store_true", help="only compare the size of the schema variants")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql", help="engine to benchmark")
+    parser.add_argument("--sqlite-path", default=DATABASE_PATH)
+    parser.add_argument(
+        "--compare-backends", action="store_true", help="only check that mysql and sqlite agree, and time both"
+    )
+    parser.add_argument("--shards", type=int, default=1, help="load the dataset split into this many files")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none", help="compression of the shards")
+    parser.add_argument("--mmap", action="store_true", help="memory-map uncompressed files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.metrics:
+        metrics.enable(args.metrics)
+
+    if args.backend == "sqlite" and not args.compare_backends:
+        pool = SQLitePool(args.sqlite_path)
+    else:
+        user = os.environ.get("MYSQL_USER") or input("> MySQL username: ")
+        password = os.environ.get("MYSQL_PASSWORD")
+        if password is None:
+            password = getpass("> MySQL password: ")
+        pool = ConnectionPool(user, password)
+
+    commit = current_commit()
+    report = {"commit": commit, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "scales": {}}
+    os.makedirs(args.data_dir, exist_ok=True)
+    for scale in args.scales:
+        path = os.path.join(args.data_dir, f"games_{scale}x.csv")
+        if not os.path.exists(path):
+            print(f"Generating {path}...")
+            generate_dataset(path, scale)
+        if args.shards > 1 or args.compression != "none":
+            path = shard_dataset(path, args.shards, args.compression)
+        if args.compare_schemas:
+            report["scales"][str(scale)] = {"database_size_mb": compare_schemas(pool, path, args.batch_size)}
+            continue
+        if args.compare_backends:
+            pools = {"mysql": pool, "sqlite": SQLitePool(args.sqlite_path)}
+            results = compare_backends(pools, path, args.batch_size, args.runs, args.compact)
+            report["scales"][str(scale)] = {"backends": results}
+            continue
+        with metrics.profile(args.profile or ""):
+            print(f"Loading {path}...")
+            load = benchmark_load(pool, path, args.batch_size, args.compact, args.compressed_reviews, args.mmap)
+            print(f"Running every catalog query {args.runs} time(s)...")
+            results = {"load": load, "queries": benchmark_queries(pool, args.runs, args.search_terms[0])}
+            if pool.backend == "mysql":
+                print("Comparing FULLTEXT search with LIKE scans...")
+                results["search"] = benchmark_search(pool, args.search_terms, args.runs)
+            print("Paging through the browsable tables...")
+            results["browse"] = benchmark_browse(pool, args.runs)
+            report["scales"][str(scale)] = results
+
+    output = args.output or f"benchmark_{commit or 'results'}.json"
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Holds VERSION when no cache directory is given, so every process on the machine sees a reload done by another one
+default_version_dir = os.path.join(os.path.expanduser("~"), ".cache", "popular_videogames")
+
+
+class ResultCache:
+    def __init__(
+        self, max_entries: int = 256, max_rows: int = 1_000_000, cache_dir: str = None, version_dir: str = None
+    ):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.cache_dir = cache_dir
+        self.version_dir = cache_dir or version_dir or default_version_dir
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.version = "0"
+        self.version_mtime = None
+        os.makedirs(self.version_dir, exist_ok=True)
+        self.check_version()
+
+    def version_path(self) -> str:
+        return os.path.join(self.version_dir, "VERSION")
+
+    def entry_path(self, key: tuple) -> str:
+        name = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.pickle")
+
+    def check_version(self):
+        # Another process may have reloaded the data, which it signals by rewriting VERSION
+        try:
+            mtime = os.stat(self.version_path()).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self.version_mtime:
+            return
+        with open(self.version_path()) as file:
+            version = file.read().strip()
+        self.version_mtime = mtime
+        if version != self.version:
+            self.version = version
+            self.clear_memory()
+
+    def current_version(self) -> str:
+        with self.lock:
+            self.check_version()
+            return self.version
+
+    def bump_version(self):
+        with self.lock:
+            self.version = str(time.time_ns())
+            self.clear_memory()
+            if self.cache_dir:
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith(".pickle"):
+                        os.remove(os.path.join(self.cache_dir, name))
+            with open(self.version_path(), "w") as file:
+                file.write(self.version)
+            self.version_mtime = os.stat(self.version_path()).st_mtime_ns
+
+    def clear_memory(self):
+        self.entries.clear()
+        self.rows = 0
+
+    def get(self, key: tuple):
+        with self.lock:
+            self.check_version()
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            result = self.load(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.remember(key, result)
+            return result
+
+    def put(self, key: tuple, columns: list, rows: list):
+        result = (columns, rows)
+        with self.lock:
+            self.remember(key, result)
+            self.store(key, result)
+
+    def remember(self, key: tuple, result: tuple):
+        if len(result[1]) > self.max_rows:
+            return
+        if key in self.entries:
+            self.rows -= len(self.entries.pop(key)[1])
+        self.entries[key] = result
+        self.rows += len(result[1])
+        # Least recently used entries go first
+        while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+            _, evicted = self.entries.popitem(last=False)
+            self.rows -= len(evicted[1])
+
+    def load(self, key: tuple):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self.entry_path(key), "rb") as file:
+                version, stored_key, result = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if version != self.version or stored_key != key:
+            return None
+        return result
+
+    def store(self, key: tuple, result: tuple):
+        if not self.cache_dir:
+            return
+        path = self.entry_path(key)
+        # Written under a temporary name so readers never see half a file
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as file:
+            pickle.dump((self.version, key, result), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+
+results = ResultCache(cache_dir=os.environ.get("VIDEOGAMES_CACHE_DIR"))
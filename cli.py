@@ -0,0 +1,160 @@
+import argparse
+import os
+import sys
+import mysql.connector as mysql
+import pandas as pd
+import dbhandling, export, metrics, queries
+from dbpool import ConnectionPool
+from sqlitepool import DATABASE_PATH, SQLitePool
+
+
+def connect(args) -> ConnectionPool:
+    if args.backend == "sqlite":
+        return SQLitePool(args.sqlite_path, size=args.connections)
+    # Nothing is asked for, so credentials come from the environment or a MySQL option file
+    option_file = args.option_file or os.environ.get("MYSQL_OPTION_FILE")
+    user = os.environ.get("MYSQL_USER")
+    if user is None and option_file is None:
+        raise ValueError("Set MYSQL_USER and MYSQL_PASSWORD, or pass --option-file.")
+    return ConnectionPool(
+        user,
+        os.environ.get("MYSQL_PASSWORD"),
+        size=args.connections,
+        host=os.environ.get("MYSQL_HOST"),
+        option_files=option_file,
+    )
+
+
+def load(pool: ConnectionPool, args, incremental: bool = False) -> int:
+    stats = dbhandling.insert_data(
+        pool,
+        args.path,
+        args.batch_size,
+        args.workers,
+        vectorized=args.vectorized,
+        incremental=incremental,
+        use_mmap=args.mmap,
+    )
+    if stats is None:
+        return 1
+    return 0 if queries.check_rollups(pool) else 1
+
+
+def command_init(pool: ConnectionPool, args) -> int:
+    dbhandling.resetdb(pool)
+    dbhandling.createdb(pool)
+    dbhandling.create_tables(pool, args.compact, args.compressed_reviews)
+    return load(pool, args)
+
+
+def command_load(pool: ConnectionPool, args) -> int:
+    # Tables are created only when they are missing, with the schema options of init
+    dbhandling.createdb(pool)
+    dbhandling.create_tables(pool, args.compact, args.compressed_reviews)
+    return load(pool, args)
+
+
+def command_incremental_load(pool: ConnectionPool, args) -> int:
+    return load(pool, args, incremental=True)
+
+
+def find_query(category: str, query: str) -> str:
+    if category not in queries.queries:
+        raise ValueError(f"{category} isn't one of {', '.join(queries.query_categories())}.")
+    options = queries.queries_inside(category)
+    # Queries can also be picked by their number in the interface's menu
+    if query.isdigit() and 1 <= int(query) <= len(options):
+        return options[int(query) - 1]
+    if query not in options:
+        raise ValueError(f"{category} has no query named '{query}'.")
+    return query
+
+
+def command_query(pool: ConnectionPool, args) -> int:
+    query = find_query(args.category, args.query)
+    params = dict(param.split("=", 1) for param in args.param)
+    # Queries run here rather than through execute_query, which prints errors instead of raising them
+    if args.category == "performance":
+        queries.explain_catalog(pool, queries.queries[args.category][query])
+        return 0
+    if args.format == "table":
+        columns, rows = queries.fetch_query(pool, args.category, query, use_cache=not args.no_cache, params=params)
+        print(pd.DataFrame(rows, columns=columns).to_string(index=False))
+        return 0
+    total_rows = export.export_query(pool, args.category, query, args.format, args.output, params, args.chunk_size)
+    if args.output != "-":
+        print(f"{total_rows} row(s) written to {args.output}.")
+    return 0
+
+
+def command_report(pool: ConnectionPool, args) -> int:
+    report = queries.run_report(pool, args.category, args.workers, use_cache=not args.no_cache)
+    return 0 if all(result["rows"] is not None for result in report) else 1
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Load and query the popular_videogames database without prompts.")
+    parser.add_argument("--backend", choices=["mysql", "sqlite"], default="mysql", help="engine holding the database")
+    parser.add_argument("--sqlite-path", default=DATABASE_PATH, help="database file of the sqlite backend")
+    parser.add_argument("--option-file", help="MySQL option file with the [client] credentials")
+    parser.add_argument("--connections", type=int, default=5, help="size of the connection pool")
+    parser.add_argument("--metrics", metavar="PATH", help="write loader and query metrics (.json or .prom)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    loaders = argparse.ArgumentParser(add_help=False)
+    loaders.add_argument(
+        "--path", nargs="+", default=["./games.csv"], help="CSV files or globs, loaded in order (.gz and .zst are decompressed)"
+    )
+    loaders.add_argument("--batch-size", type=int, default=1000)
+    loaders.add_argument("--workers", type=int, default=None, help="parser processes (1 parses inline)")
+    loaders.add_argument("--vectorized", action="store_true", help="parse with the pandas columnar reader")
+    loaders.add_argument("--mmap", action="store_true", help="memory-map uncompressed files instead of reading them")
+    schema = argparse.ArgumentParser(add_help=False)
+    schema.add_argument("--compact", action="store_true", help="key developers and genres by integer ids")
+    schema.add_argument(
+        "--compressed-reviews", action="store_true", help="store reviews in compressed InnoDB pages (ignored by sqlite)"
+    )
+
+    init = commands.add_parser("init", parents=[loaders, schema], help="drop, recreate and load the database")
+    init.set_defaults(handler=command_init)
+    load = commands.add_parser("load", parents=[loaders, schema], help="create what is missing and load the data")
+    load.set_defaults(handler=command_load)
+    incremental = commands.add_parser("incremental-load", parents=[loaders], help="load only the changed rows")
+    incremental.set_defaults(handler=command_incremental_load)
+
+    query = commands.add_parser("query", help="run one catalog query")
+    query.add_argument("category", choices=queries.query_categories())
+    query.add_argument("query", help="query name, or its number in the category")
+    query.add_argument("--param", action="append", default=[], metavar="NAME=VALUE")
+    query.add_argument("--format", choices=["table"] + export.formats, default="table")
+    query.add_argument("--output", default="-", help="file to export to (- for stdout)")
+    query.add_argument("--chunk-size", type=int, default=10000, help="rows per exported batch")
+    query.add_argument("--no-cache", action="store_true")
+    query.set_defaults(handler=command_query)
+
+    report = commands.add_parser("report", help="run whole categories concurrently")
+    report.add_argument(
+        "--category", action="append", choices=[category for category in queries.query_categories() if category != "performance"]
+    )
+    report.add_argument("--workers", type=int, default=None, help="queries in flight (defaults to --connections)")
+    report.add_argument("--no-cache", action="store_true")
+    report.set_defaults(handler=command_report)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = parser().parse_args(argv)
+    if args.metrics:
+        metrics.enable(args.metrics)
+    try:
+        pool = connect(args)
+        with metrics.profile(args.profile or ""):
+            return args.handler(pool, args)
+    except (mysql.Error, ValueError, OSError) as err:
+        print(f"Error: {err}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
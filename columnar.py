@@ -0,0 +1,191 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+import dbhandling
+
+columns = [
+    "game_id",
+    "game_title",
+    "release_date",
+    "team",
+    "rating",
+    "times_listed",
+    "number_of_reviews",
+    "genres",
+    "summary",
+    "reviews",
+    "plays",
+    "playing",
+    "backlogs",
+    "wishlist",
+]
+counter_columns = ["rating", "times_listed", "number_of_reviews", "plays", "playing", "backlogs", "wishlist"]
+
+
+def read_games(path: str = "./games.csv", chunk_size: int = None, use_mmap: bool = False):
+    # Everything is read as text so the conversions below see the same strings as the csv module.
+    # gzip and zstd shards are recognized by their extension and decompressed as the chunks are read
+    return pd.read_csv(
+        path,
+        header=0,
+        names=columns,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunk_size,
+        memory_map=use_mmap,
+    )
+
+
+def convert_unique(values: pd.Series, convert) -> np.ndarray:
+    # Dates, counters and genre lists repeat heavily, so only the distinct strings are
+    # converted and the result is broadcast back through the factorized codes
+    codes, uniques = pd.factorize(values)
+    return convert(pd.Series(uniques, dtype=object))[codes]
+
+
+def parse_dates(dates: pd.Series) -> np.ndarray:
+    # "releases on TBD" and empty cells fail to parse and become None, like in date_convert
+    parsed = pd.to_datetime(dates, format="%b %d, %Y", errors="coerce").to_numpy()
+    converted = np.datetime_as_string(parsed, unit="D").astype(object)
+    converted[np.isnat(parsed)] = None
+    return converted
+
+
+def parse_counters(values: pd.Series) -> np.ndarray:
+    # "3.9K" is 3900, "4.5" a float and "12" an int, matching num_variable_processing
+    empty = (values == "").to_numpy()
+    thousands = values.str.endswith("K").to_numpy()
+    decimal = values.str.contains(".", regex=False).to_numpy() & ~thousands
+    whole = ~(empty | thousands | decimal)
+    numbers = pd.to_numeric(values.str.removesuffix("K").mask(empty)).to_numpy(dtype=np.float64)
+    # Object arrays keep Python ints, floats and None, which is what the connector expects
+    converted = np.full(len(values), None, dtype=object)
+    converted[thousands] = (numbers[thousands] * 1000).astype(np.int64).tolist()
+    converted[decimal] = numbers[decimal].tolist()
+    converted[whole] = numbers[whole].astype(np.int64).tolist()
+    return converted
+
+
+def parse_multivalued(values: pd.Series) -> np.ndarray:
+    converted = np.empty(len(values), dtype=object)
+    for position, value in enumerate(values):
+        converted[position] = dbhandling.multivalued_processing(value)
+    return converted
+
+
+def convert_dates(dates: pd.Series) -> np.ndarray:
+    return convert_unique(dates, parse_dates)
+
+
+def convert_counters(values: pd.Series) -> np.ndarray:
+    return convert_unique(values, parse_counters)
+
+
+def convert_multivalued(values: pd.Series) -> np.ndarray:
+    return convert_unique(values, parse_multivalued)
+
+
+def typed_videogames(frame: pd.DataFrame) -> dict:
+    # Object arrays keep Python ints, floats and None, which is what the connector expects
+    typed = {
+        "game_id": frame["game_id"].astype(np.int64).to_numpy(dtype=object),
+        "game_title": frame["game_title"].to_numpy(dtype=object),
+        "release_date": convert_dates(frame["release_date"]),
+    }
+    for column in counter_columns[:3]:
+        typed[column] = convert_counters(frame[column])
+    typed["summary"] = frame["summary"].to_numpy(dtype=object)
+    for column in counter_columns[3:]:
+        typed[column] = convert_counters(frame[column])
+    return typed
+
+
+def relationship(frame: pd.DataFrame, column: str, name: str) -> pd.DataFrame:
+    related = pd.DataFrame(
+        {
+            "game_id": frame["game_id"].astype(np.int64),
+            name: convert_multivalued(frame[column]),
+        }
+    )
+    return related.explode(name).dropna(subset=[name]).reset_index(drop=True)
+
+
+def developed_by(frame: pd.DataFrame) -> pd.DataFrame:
+    return relationship(frame, "team", "developer")
+
+
+def genre_is(frame: pd.DataFrame) -> pd.DataFrame:
+    return relationship(frame, "genres", "genre_name")
+
+
+def reviews(frame: pd.DataFrame) -> pd.DataFrame:
+    return relationship(frame, "reviews", "content")
+
+
+def parse_frame(frame: pd.DataFrame) -> list:
+    videogames = typed_videogames(frame)
+    developers = convert_multivalued(frame["team"])
+    genres = convert_multivalued(frame["genres"])
+    game_reviews = convert_multivalued(frame["reviews"])
+    return list(zip(zip(*videogames.values()), developers, genres, game_reviews))
+
+
+def parsed_chunks(paths: list, chunk_size: int = 5000, use_mmap: bool = False):
+    # Same (shard, records) chunks as dbhandling.parsed_chunks, decoded a chunk of columns at a time
+    for shard, path in enumerate(paths):
+        with read_games(path, chunk_size, use_mmap) as frames:
+            for frame in frames:
+                yield shard, parse_frame(frame)
+
+
+def parsed_records(path="./games.csv", chunk_size: int = 5000, use_mmap: bool = False):
+    for _, records in parsed_chunks(dbhandling.source_paths(path), chunk_size, use_mmap):
+        yield from records
+
+
+def benchmark(path: str = "./games.csv", repeat: int = 5):
+    timings = {"row by row": [], "columnar": []}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scalar_records = list(dbhandling.parsed_records(path, workers=1))
+        timings["row by row"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        columnar_records = list(parsed_records(path))
+        timings["columnar"].append(time.perf_counter() - start)
+
+    if scalar_records != columnar_records:
+        print("Error: the columnar parser produced different values.")
+        return
+
+    for path_name, seconds in timings.items():
+        best = min(seconds)
+        print(f"{path_name}: {best * 1000:.1f} ms ({len(scalar_records) / best:.0f} rows/s)")
+    print(f"Speed-up: {min(timings['row by row']) / min(timings['columnar']):.2f}x")
+
+    # Scalar helpers against their vectorized counterparts, on text that is already in memory
+    frame = read_games(path)
+    start = time.perf_counter()
+    for date in frame["release_date"]:
+        dbhandling.date_convert(date)
+    for column in counter_columns:
+        for value in frame[column]:
+            dbhandling.num_variable_processing(value)
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    convert_dates(frame["release_date"])
+    for column in counter_columns:
+        convert_counters(frame[column])
+    vectorized_seconds = time.perf_counter() - start
+    print(f"Dates and counters: {scalar_seconds * 1000:.1f} ms scalar, {vectorized_seconds * 1000:.1f} ms vectorized")
+
+    start = time.perf_counter()
+    relations = [developed_by(frame), genre_is(frame), reviews(frame)]
+    seconds = time.perf_counter() - start
+    print(f"Relationship frames: {seconds * 1000:.1f} ms ({sum(len(related) for related in relations)} rows)")
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:2])
@@ -1,28 +1,51 @@
 import mysql.connector as mysql
+import concurrent.futures
 import csv
 import ast
+import glob
+import gzip
+import hashlib
+import io
+import itertools
+import mmap
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+import cache
+import metrics
+from dbpool import ConnectionPool, collation_key
 
 
-def createdb(user: str, password: str):
-    try:
-        with mysql.connect(host="localhost", user=user, passwd=password) as db_conn:
-            with db_conn.cursor() as cursor:
-                cursor.execute("SHOW DATABASES LIKE 'popular_videogames'")
-                database_exists = cursor.fetchone()
+def database_exists(pool: ConnectionPool) -> bool:
+    if pool.backend == "sqlite":
+        return os.path.exists(pool.path)
+    with pool.connection(database=False) as db_conn:
+        with db_conn.cursor() as cursor:
+            cursor.execute("SHOW DATABASES LIKE 'popular_videogames'")
+            return cursor.fetchone() is not None
+
 
-                if not database_exists:
+def createdb(pool: ConnectionPool):
+    try:
+        if database_exists(pool):
+            print("Database exists already.")
+            return
+        with pool.connection(database=False) as db_conn:
+            # An embedded database is the file its first connection creates
+            if pool.backend != "sqlite":
+                with db_conn.cursor() as cursor:
                     cursor.execute("CREATE DATABASE popular_videogames ")
-                    print("Database created successfully.")
-                else:
-                    print("Database exists already.")
+        print("Database created successfully.")
 
     except mysql.Error as err:
         print(f"Error: {err}")
 
 
-def create_tables(user: str, password: str):
+def create_tables(pool: ConnectionPool, compact: bool = False, compressed_reviews: bool = False):
     try:
-        with mysql.connect(host="localhost", user=user, passwd=password, database="popular_videogames") as db_conn:
+        with pool.connection() as db_conn:
             with db_conn.cursor() as cursor:
                 videogames = (
                     "CREATE TABLE IF NOT EXISTS videogames("
@@ -36,20 +59,54 @@ def create_tables(user: str, password: str):
                     "plays INT,"
                     "playing INT,"
                     "backlogs INT,"
-                    "wishlist INT);"
+                    "wishlist INT,"
+                    "release_year SMALLINT AS (YEAR(release_date)) STORED,"
+                    "release_decade SMALLINT AS (YEAR(release_date) DIV 10 * 10) STORED,"
+                    "INDEX idx_game_title (game_title),"
+                    "INDEX idx_release_date (release_date),"
+                    "INDEX idx_release_year (release_year),"
+                    "INDEX idx_release_decade (release_decade),"
+                    "INDEX idx_rating (rating),"
+                    "INDEX idx_plays (plays),"
+                    "INDEX idx_playing (playing),"
+                    "INDEX idx_wishlist (wishlist),"
+                    "FULLTEXT INDEX idx_summary_text (summary));"
                 )
 
                 developers = "CREATE TABLE IF NOT EXISTS developers(" "name VARCHAR(100) PRIMARY KEY);"
 
                 genre = "CREATE TABLE IF NOT EXISTS genre(" "name VARCHAR(100) PRIMARY KEY);"
 
+                if compact:
+                    # Integer surrogate keys, so the junction tables store 4-byte ids instead of names
+                    developers = (
+                        "CREATE TABLE IF NOT EXISTS developers("
+                        "id INT PRIMARY KEY,"
+                        "name VARCHAR(100) NOT NULL,"
+                        "UNIQUE INDEX idx_name (name));"
+                    )
+
+                    genre = (
+                        "CREATE TABLE IF NOT EXISTS genre("
+                        "id INT PRIMARY KEY,"
+                        "name VARCHAR(100) NOT NULL,"
+                        "UNIQUE INDEX idx_name (name));"
+                    )
+
                 reviews = (
                     "CREATE TABLE IF NOT EXISTS reviews("
                     "id INT PRIMARY KEY AUTO_INCREMENT,"
                     "content VARCHAR(8000) NOT NULL,"
+                    "content_hash BINARY(20) NOT NULL,"
                     "game_id INT NOT NULL,"
-                    "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE);"
+                    "source_id INT NOT NULL,"
+                    "UNIQUE INDEX idx_game_content (game_id, content_hash),"
+                    "INDEX idx_source_id (source_id),"
+                    "FULLTEXT INDEX idx_content_text (content),"
+                    "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE)"
                 )
+                # InnoDB compresses the pages itself, so queries still read plain text
+                reviews += " ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8;" if compressed_reviews else ";"
 
                 developed_by = (
                     "CREATE TABLE IF NOT EXISTS developed_by("
@@ -69,36 +126,229 @@ def create_tables(user: str, password: str):
                     "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);"
                 )
 
-                cursor.execute(videogames)
-                cursor.execute(developers)
-                cursor.execute(genre)
-                cursor.execute(reviews)
-                cursor.execute(developed_by)
-                cursor.execute(genre_is)
+                if compact:
+                    developed_by = (
+                        "CREATE TABLE IF NOT EXISTS developed_by("
+                        "developer_id INT NOT NULL,"
+                        "game_id INT NOT NULL,"
+                        "PRIMARY KEY (developer_id, game_id),"
+                        "FOREIGN KEY (developer_id) REFERENCES developers(id) ON DELETE CASCADE,"
+                        "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE);"
+                    )
+
+                    genre_is = (
+                        "CREATE TABLE IF NOT EXISTS genre_is("
+                        "game_id INT NOT NULL,"
+                        "genre_id INT NOT NULL,"
+                        "PRIMARY KEY (game_id, genre_id),"
+                        "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE,"
+                        "FOREIGN KEY (genre_id) REFERENCES genre(id) ON DELETE CASCADE);"
+                    )
+
+                # One fingerprint per CSV row, so later loads only apply what changed
+                source_rows = (
+                    "CREATE TABLE IF NOT EXISTS source_rows("
+                    "game_id INT PRIMARY KEY,"
+                    "row_hash BINARY(20) NOT NULL,"
+                    "target_id INT NOT NULL,"
+                    "INDEX idx_target_id (target_id));"
+                )
+
+                # Rollups kept up to date by insert_data
+                genre_stats = (
+                    "CREATE TABLE IF NOT EXISTS genre_stats("
+                    "genre_name VARCHAR(100) PRIMARY KEY,"
+                    "num_games INT NOT NULL DEFAULT 0,"
+                    "rating_count INT NOT NULL DEFAULT 0,"
+                    "rating_sum BIGINT NOT NULL DEFAULT 0,"
+                    "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);"
+                )
+
+                developer_stats = (
+                    "CREATE TABLE IF NOT EXISTS developer_stats("
+                    "developer VARCHAR(100) PRIMARY KEY,"
+                    "num_games INT NOT NULL DEFAULT 0,"
+                    "rating_count INT NOT NULL DEFAULT 0,"
+                    "rating_sum BIGINT NOT NULL DEFAULT 0,"
+                    "num_reviews INT NOT NULL DEFAULT 0,"
+                    "num_genres INT NOT NULL DEFAULT 0,"
+                    "INDEX idx_num_reviews (num_reviews),"
+                    "INDEX idx_num_genres (num_genres),"
+                    "FOREIGN KEY (developer) REFERENCES developers(name) ON DELETE CASCADE);"
+                )
+
+                developer_genres = (
+                    "CREATE TABLE IF NOT EXISTS developer_genres("
+                    "developer VARCHAR(100) NOT NULL,"
+                    "genre_name VARCHAR(100) NOT NULL,"
+                    "PRIMARY KEY (developer, genre_name),"
+                    "FOREIGN KEY (developer) REFERENCES developers(name) ON DELETE CASCADE,"
+                    "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);"
+                )
+
+                statements = (
+                    videogames,
+                    developers,
+                    genre,
+                    reviews,
+                    developed_by,
+                    genre_is,
+                    source_rows,
+                    genre_stats,
+                    developer_stats,
+                    developer_genres,
+                )
+                if pool.backend == "sqlite":
+                    statements = sqlite_tables(compact)
+                for statement in statements:
+                    cursor.execute(statement)
 
                 print("Tables have been created successfully.")
+        cache.results.bump_version()
 
     except mysql.Error as err:
         print(f"Error: {err}")
 
 
+def sqlite_tables(compact: bool = False) -> list:
+    # The same tables for the embedded engine: indexes are separate statements with names unique to the database,
+    # there is no FULLTEXT, and names use the ai_ci collation registered by SQLitePool
+    name = "VARCHAR(100) COLLATE ai_ci"
+    statements = [
+        "CREATE TABLE IF NOT EXISTS videogames("
+        "game_id INTEGER PRIMARY KEY,"
+        f"game_title {name} NOT NULL,"
+        "release_date DATE,"
+        "rating INT,"
+        "times_listed INT,"
+        "number_of_reviews INT,"
+        "summary VARCHAR(4000),"
+        "plays INT,"
+        "playing INT,"
+        "backlogs INT,"
+        "wishlist INT,"
+        "release_year SMALLINT AS (CAST(strftime('%Y', release_date) AS INTEGER)) STORED,"
+        "release_decade SMALLINT AS (CAST(strftime('%Y', release_date) AS INTEGER) / 10 * 10) STORED);",
+        "CREATE INDEX IF NOT EXISTS idx_game_title ON videogames(game_title);",
+        "CREATE INDEX IF NOT EXISTS idx_release_date ON videogames(release_date);",
+        "CREATE INDEX IF NOT EXISTS idx_release_year ON videogames(release_year);",
+        "CREATE INDEX IF NOT EXISTS idx_release_decade ON videogames(release_decade);",
+        "CREATE INDEX IF NOT EXISTS idx_rating ON videogames(rating);",
+        "CREATE INDEX IF NOT EXISTS idx_plays ON videogames(plays);",
+        "CREATE INDEX IF NOT EXISTS idx_playing ON videogames(playing);",
+        "CREATE INDEX IF NOT EXISTS idx_wishlist ON videogames(wishlist);",
+    ]
+    if compact:
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS developers(id INTEGER PRIMARY KEY, name {name} NOT NULL UNIQUE);",
+            f"CREATE TABLE IF NOT EXISTS genre(id INTEGER PRIMARY KEY, name {name} NOT NULL UNIQUE);",
+        ]
+    else:
+        statements += [
+            f"CREATE TABLE IF NOT EXISTS developers(name {name} PRIMARY KEY);",
+            f"CREATE TABLE IF NOT EXISTS genre(name {name} PRIMARY KEY);",
+        ]
+    statements += [
+        # AUTOINCREMENT never hands out an id twice, which the review watermark of the rollups relies on
+        "CREATE TABLE IF NOT EXISTS reviews("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "content VARCHAR(8000) NOT NULL,"
+        "content_hash BINARY(20) NOT NULL,"
+        "game_id INT NOT NULL,"
+        "source_id INT NOT NULL,"
+        "UNIQUE (game_id, content_hash),"
+        "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE);",
+        "CREATE INDEX IF NOT EXISTS idx_source_id ON reviews(source_id);",
+    ]
+    if compact:
+        statements += [
+            "CREATE TABLE IF NOT EXISTS developed_by("
+            "developer_id INT NOT NULL,"
+            "game_id INT NOT NULL,"
+            "PRIMARY KEY (developer_id, game_id),"
+            "FOREIGN KEY (developer_id) REFERENCES developers(id) ON DELETE CASCADE,"
+            "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE);",
+            "CREATE TABLE IF NOT EXISTS genre_is("
+            "game_id INT NOT NULL,"
+            "genre_id INT NOT NULL,"
+            "PRIMARY KEY (game_id, genre_id),"
+            "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE,"
+            "FOREIGN KEY (genre_id) REFERENCES genre(id) ON DELETE CASCADE);",
+            "CREATE INDEX IF NOT EXISTS idx_developed_by_game ON developed_by(game_id);",
+            "CREATE INDEX IF NOT EXISTS idx_genre_is_genre ON genre_is(genre_id);",
+        ]
+    else:
+        statements += [
+            "CREATE TABLE IF NOT EXISTS developed_by("
+            f"developer {name} NOT NULL,"
+            "game_id INT NOT NULL,"
+            "PRIMARY KEY (developer, game_id),"
+            "FOREIGN KEY (developer) REFERENCES developers(name) ON DELETE CASCADE,"
+            "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE);",
+            "CREATE TABLE IF NOT EXISTS genre_is("
+            "game_id INT NOT NULL,"
+            f"genre_name {name} NOT NULL,"
+            "PRIMARY KEY (game_id, genre_name),"
+            "FOREIGN KEY (game_id) REFERENCES videogames(game_id) ON DELETE CASCADE,"
+            "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);",
+            # InnoDB indexes foreign keys by itself, SQLite has to be told, or every cascade scans the table
+            "CREATE INDEX IF NOT EXISTS idx_developed_by_game ON developed_by(game_id);",
+            "CREATE INDEX IF NOT EXISTS idx_genre_is_genre ON genre_is(genre_name);",
+        ]
+    statements += [
+        "CREATE TABLE IF NOT EXISTS source_rows("
+        "game_id INTEGER PRIMARY KEY,"
+        "row_hash BINARY(20) NOT NULL,"
+        "target_id INT NOT NULL);",
+        "CREATE INDEX IF NOT EXISTS idx_target_id ON source_rows(target_id);",
+        "CREATE TABLE IF NOT EXISTS genre_stats("
+        f"genre_name {name} PRIMARY KEY,"
+        "num_games INT NOT NULL DEFAULT 0,"
+        "rating_count INT NOT NULL DEFAULT 0,"
+        "rating_sum BIGINT NOT NULL DEFAULT 0,"
+        "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);",
+        "CREATE TABLE IF NOT EXISTS developer_stats("
+        f"developer {name} PRIMARY KEY,"
+        "num_games INT NOT NULL DEFAULT 0,"
+        "rating_count INT NOT NULL DEFAULT 0,"
+        "rating_sum BIGINT NOT NULL DEFAULT 0,"
+        "num_reviews INT NOT NULL DEFAULT 0,"
+        "num_genres INT NOT NULL DEFAULT 0,"
+        "FOREIGN KEY (developer) REFERENCES developers(name) ON DELETE CASCADE);",
+        "CREATE INDEX IF NOT EXISTS idx_num_reviews ON developer_stats(num_reviews);",
+        "CREATE INDEX IF NOT EXISTS idx_num_genres ON developer_stats(num_genres);",
+        "CREATE TABLE IF NOT EXISTS developer_genres("
+        f"developer {name} NOT NULL,"
+        f"genre_name {name} NOT NULL,"
+        "PRIMARY KEY (developer, genre_name),"
+        "FOREIGN KEY (developer) REFERENCES developers(name) ON DELETE CASCADE,"
+        "FOREIGN KEY (genre_name) REFERENCES genre(name) ON DELETE CASCADE);",
+        "CREATE INDEX IF NOT EXISTS idx_developer_genres_genre ON developer_genres(genre_name);",
+        # Creates sqlite_stat1, which the row counts of the database category read
+        "ANALYZE;",
+    ]
+    return statements
+
+
+month_dict = {
+    "Jan": "01",
+    "Feb": "02",
+    "Mar": "03",
+    "Apr": "04",
+    "May": "05",
+    "Jun": "06",
+    "Jul": "07",
+    "Aug": "08",
+    "Sep": "09",
+    "Oct": "10",
+    "Nov": "11",
+    "Dec": "12",
+}
+
+
 def date_convert(date: str) -> str:
     if date == "" or date[0:3] == "rel":
         return None
-    month_dict = {
-        "Jan": "01",
-        "Feb": "02",
-        "Mar": "03",
-        "Apr": "04",
-        "May": "05",
-        "Jun": "06",
-        "Jul": "07",
-        "Aug": "08",
-        "Sep": "09",
-        "Oct": "10",
-        "Nov": "11",
-        "Dec": "12",
-    }
     day = date[4:6]
     month = month_dict[date[0:3]]
     year = date[-4:]
@@ -123,134 +373,842 @@ def multivalued_processing(original_string: str):
         return []
 
 
-def insert_data(user: str, password: str):
+def parse_row(row: list) -> tuple:
+    # Primary Key
+    game_id = int(row[0])
+
+    # String Values
+    game_title = row[1]
+    summary = row[8]
+
+    # Date
+    release_date = date_convert(row[2])
+
+    # Numerical Values
+    rating = num_variable_processing(row[4])
+    times_listed = num_variable_processing(row[5])
+    num_reviews = num_variable_processing(row[6])
+    plays = num_variable_processing(row[10])
+    playing = num_variable_processing(row[11])
+    backlogs = num_variable_processing(row[12])
+    wishlist = num_variable_processing(row[13])
+
+    # (Potential) Multivalued Attributes
+    developers = multivalued_processing(row[3])
+    genres = multivalued_processing(row[7])
+    reviews = multivalued_processing(row[9])
+
+    videogame_data = (
+        game_id,
+        game_title,
+        release_date,
+        rating,
+        times_listed,
+        num_reviews,
+        summary,
+        plays,
+        playing,
+        backlogs,
+        wishlist,
+    )
+    return videogame_data, developers, genres, reviews
+
+
+def parse_chunk(rows: list) -> list:
+    return [parse_row(row) for row in rows]
+
+
+def timed_parse_chunk(rows: list) -> tuple:
+    start = time.perf_counter()
+    records = parse_chunk(rows)
+    return records, time.perf_counter() - start
+
+
+def source_paths(path) -> list:
+    # A file, a glob or a list of either. Each glob's shards are taken in name order, which is the export's order
+    # as long as the shard numbers are zero-padded
+    patterns = [path] if isinstance(path, str) else list(path)
+    paths = []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise FileNotFoundError(f"No file matches {pattern}.")
+            paths += matches
+        else:
+            paths.append(pattern)
+    return paths
+
+
+@contextmanager
+def source_lines(path: str, use_mmap: bool = False):
+    # Compressed shards are decompressed as the csv module asks for lines, so none is ever held whole in memory
+    if path.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+            yield file
+    elif path.endswith((".zst", ".zstd")):
+        import zstandard
+
+        with open(path, "rb") as file:
+            with zstandard.ZstdDecompressor().stream_reader(file) as stream:
+                yield io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    elif use_mmap and os.path.getsize(path) > 0:
+        # Lines are sliced out of the page cache instead of being copied through a read buffer first
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield (line.decode() for line in iter(mapped.readline, b""))
+    else:
+        with open(path, newline="") as file:
+            yield file
+
+
+def read_chunks(path: str, chunk_size: int, use_mmap: bool = False):
+    with source_lines(path, use_mmap) as lines:
+        dataset = csv.reader(lines, delimiter=",")
+        # Every shard starts with its own header
+        if next(dataset, None) is None:
+            return
+        while True:
+            chunk = list(itertools.islice(dataset, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+def parsed_chunks(
+    paths: list,
+    workers: int = None,
+    chunk_size: int = 500,
+    queue_size: int = 8,
+    use_mmap: bool = False,
+    readers: int = 2,
+):
+    if workers is not None and workers <= 1:
+        for shard, path in enumerate(paths):
+            for chunk in read_chunks(path, chunk_size, use_mmap):
+                records, seconds = timed_parse_chunk(chunk)
+                metrics.record("loader.parse", seconds, count=len(records))
+                yield shard, records
+        return
+
+    # Each shard's futures are queued in file order and the shards are drained in order, so records come out in the
+    # order of the concatenated files. Up to `readers` shards are read and decompressed at once, started in order so
+    # the shard being drained always has one, and each bounded queue caps how many of its chunks are in flight
+    pendings = [queue.Queue(maxsize=queue_size) for _ in paths]
+    stop = threading.Event()
+    slots = threading.Semaphore(readers)
+    started = []
+
+    def produce(executor, path, pending):
+        try:
+            for chunk in read_chunks(path, chunk_size, use_mmap):
+                future = executor.submit(timed_parse_chunk, chunk)
+                while not stop.is_set():
+                    try:
+                        pending.put(future, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    future.cancel()
+                    return
+        except Exception as err:
+            pending.put(err)
+        finally:
+            slots.release()
+            pending.put(None)
+
+    def launch(executor):
+        for path, pending in zip(paths, pendings):
+            while not slots.acquire(timeout=0.1):
+                if stop.is_set():
+                    return
+            reader = threading.Thread(target=produce, args=(executor, path, pending), daemon=True)
+            started.append((reader, pending))
+            reader.start()
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        launcher = threading.Thread(target=launch, args=(executor,), daemon=True)
+        launcher.start()
+        try:
+            for shard, pending in enumerate(pendings):
+                while True:
+                    item = pending.get()
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    wait_start = time.perf_counter()
+                    records, seconds = item.result()
+                    metrics.record("loader.parse_wait", time.perf_counter() - wait_start)
+                    metrics.record("loader.parse", seconds, count=len(records))
+                    yield shard, records
+        finally:
+            stop.set()
+            launcher.join()
+            for reader, pending in started:
+                while reader.is_alive() or not pending.empty():
+                    try:
+                        item = pending.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if isinstance(item, concurrent.futures.Future):
+                        item.cancel()
+                reader.join()
+
+
+def parsed_records(path, workers: int = None, chunk_size: int = 500, queue_size: int = 8, use_mmap: bool = False):
+    for _, records in parsed_chunks(source_paths(path), workers, chunk_size, queue_size, use_mmap):
+        yield from records
+
+
+def shard_throughput(chunks, paths: list, shard_stats: dict):
+    # A shard's time runs from its first chunk to the next shard's, so it includes whatever consumes its records.
+    # Only the first pass over a shard is kept, when a load reads the sources twice
+    current, start, rows = None, 0.0, 0
+
+    def close_shard():
+        seconds = time.perf_counter() - start
+        path = paths[current]
+        if path not in shard_stats:
+            shard_stats[path] = {"rows": rows, "seconds": seconds, "bytes": os.path.getsize(path)}
+            metrics.record("loader.shard", seconds, count=rows, shard=os.path.basename(path))
+
+    for shard, records in chunks:
+        if shard != current:
+            if current is not None:
+                close_shard()
+            current, start, rows = shard, time.perf_counter(), 0
+        rows += len(records)
+        yield from records
+    if current is not None:
+        close_shard()
+
+
+# {games} is either a list of placeholders for the game_ids of one batch or a subquery over every game
+# In the compact schema the junction tables are read through their names, so one set of rollup statements covers both
+relations = {
+    False: {"developed_by": "developed_by", "genre_is": "genre_is"},
+    True: {
+        "developed_by": "(SELECT dv.name AS developer, db.game_id FROM developed_by db JOIN developers dv ON dv.id = db.developer_id)",
+        "genre_is": "(SELECT gi.game_id, gn.name AS genre_name FROM genre_is gi JOIN genre gn ON gn.id = gi.genre_id)",
+    },
+}
+rollup_statements = {
+    "mysql": (
+        "INSERT INTO genre_stats(genre_name, num_games, rating_count, rating_sum) "
+        "SELECT g.genre_name, COUNT(*), COUNT(v.rating), COALESCE(SUM(v.rating), 0) "
+        "FROM {genre_is} g JOIN videogames v ON v.game_id = g.game_id "
+        "WHERE g.game_id IN ({games}) "
+        "GROUP BY g.genre_name "
+        "ON DUPLICATE KEY UPDATE "
+        "num_games = num_games + VALUES(num_games), "
+        "rating_count = rating_count + VALUES(rating_count), "
+        "rating_sum = rating_sum + VALUES(rating_sum)",
+        "INSERT INTO developer_stats(developer, num_games, rating_count, rating_sum) "
+        "SELECT d.developer, COUNT(*), COUNT(v.rating), COALESCE(SUM(v.rating), 0) "
+        "FROM {developed_by} d JOIN videogames v ON v.game_id = d.game_id "
+        "WHERE d.game_id IN ({games}) "
+        "GROUP BY d.developer "
+        "ON DUPLICATE KEY UPDATE "
+        "num_games = num_games + VALUES(num_games), "
+        "rating_count = rating_count + VALUES(rating_count), "
+        "rating_sum = rating_sum + VALUES(rating_sum)",
+        "INSERT IGNORE INTO developer_genres(developer, genre_name) "
+        "SELECT DISTINCT d.developer, g.genre_name "
+        "FROM {developed_by} d JOIN {genre_is} g ON g.game_id = d.game_id "
+        "WHERE d.game_id IN ({games})",
+        "UPDATE developer_stats s JOIN ("
+        "SELECT dg.developer, COUNT(*) AS num_genres FROM developer_genres dg "
+        "WHERE dg.developer IN (SELECT d.developer FROM {developed_by} d WHERE d.game_id IN ({games})) "
+        "GROUP BY dg.developer) n ON n.developer = s.developer "
+        "SET s.num_genres = n.num_genres",
+    ),
+    # SQLite spells the upserts with ON CONFLICT and excluded, and the joined update with UPDATE ... FROM
+    "sqlite": (
+        "INSERT INTO genre_stats(genre_name, num_games, rating_count, rating_sum) "
+        "SELECT g.genre_name, COUNT(*), COUNT(v.rating), COALESCE(SUM(v.rating), 0) "
+        "FROM {genre_is} g JOIN videogames v ON v.game_id = g.game_id "
+        "WHERE g.game_id IN ({games}) "
+        "GROUP BY g.genre_name "
+        "ON CONFLICT (genre_name) DO UPDATE SET "
+        "num_games = num_games + excluded.num_games, "
+        "rating_count = rating_count + excluded.rating_count, "
+        "rating_sum = rating_sum + excluded.rating_sum",
+        "INSERT INTO developer_stats(developer, num_games, rating_count, rating_sum) "
+        "SELECT d.developer, COUNT(*), COUNT(v.rating), COALESCE(SUM(v.rating), 0) "
+        "FROM {developed_by} d JOIN videogames v ON v.game_id = d.game_id "
+        "WHERE d.game_id IN ({games}) "
+        "GROUP BY d.developer "
+        "ON CONFLICT (developer) DO UPDATE SET "
+        "num_games = num_games + excluded.num_games, "
+        "rating_count = rating_count + excluded.rating_count, "
+        "rating_sum = rating_sum + excluded.rating_sum",
+        "INSERT OR IGNORE INTO developer_genres(developer, genre_name) "
+        "SELECT DISTINCT d.developer, g.genre_name "
+        "FROM {developed_by} d JOIN {genre_is} g ON g.game_id = d.game_id "
+        "WHERE d.game_id IN ({games})",
+        "UPDATE developer_stats SET num_genres = n.num_genres FROM ("
+        "SELECT dg.developer, COUNT(*) AS num_genres FROM developer_genres dg "
+        "WHERE dg.developer IN (SELECT d.developer FROM {developed_by} d WHERE d.game_id IN ({games})) "
+        "GROUP BY dg.developer) AS n WHERE n.developer = developer_stats.developer",
+    ),
+}
+review_rollup_statements = {
+    "mysql": (
+        "INSERT INTO developer_stats(developer, num_reviews) "
+        "SELECT d.developer, COUNT(*) "
+        "FROM reviews r JOIN {developed_by} d ON d.game_id = r.game_id "
+        "WHERE r.id > %s "
+        "GROUP BY d.developer "
+        "ON DUPLICATE KEY UPDATE num_reviews = num_reviews + VALUES(num_reviews)"
+    ),
+    "sqlite": (
+        "INSERT INTO developer_stats(developer, num_reviews) "
+        "SELECT d.developer, COUNT(*) "
+        "FROM reviews r JOIN {developed_by} d ON d.game_id = r.game_id "
+        "WHERE r.id > %s "
+        "GROUP BY d.developer "
+        "ON CONFLICT (developer) DO UPDATE SET num_reviews = num_reviews + excluded.num_reviews"
+    ),
+}
+
+
+# Take back what the games and reviews about to be deleted added, {games} being placeholders for their source ids
+retract_statements = {
+    "mysql": (
+        "UPDATE genre_stats s JOIN ("
+        "SELECT g.genre_name, COUNT(*) AS num_games, COUNT(v.rating) AS rating_count, "
+        "COALESCE(SUM(v.rating), 0) AS rating_sum "
+        "FROM {genre_is} g JOIN videogames v ON v.game_id = g.game_id "
+        "WHERE g.game_id IN ({games}) "
+        "GROUP BY g.genre_name) n ON n.genre_name = s.genre_name "
+        "SET s.num_games = s.num_games - n.num_games, "
+        "s.rating_count = s.rating_count - n.rating_count, "
+        "s.rating_sum = s.rating_sum - n.rating_sum",
+        "UPDATE developer_stats s JOIN ("
+        "SELECT d.developer, COUNT(*) AS num_games, COUNT(v.rating) AS rating_count, "
+        "COALESCE(SUM(v.rating), 0) AS rating_sum "
+        "FROM {developed_by} d JOIN videogames v ON v.game_id = d.game_id "
+        "WHERE d.game_id IN ({games}) "
+        "GROUP BY d.developer) n ON n.developer = s.developer "
+        "SET s.num_games = s.num_games - n.num_games, "
+        "s.rating_count = s.rating_count - n.rating_count, "
+        "s.rating_sum = s.rating_sum - n.rating_sum",
+        # A deleted game takes its reviews along, whichever source row they came from
+        "UPDATE developer_stats s JOIN ("
+        "SELECT d.developer, COUNT(*) AS num_reviews "
+        "FROM reviews r JOIN {developed_by} d ON d.game_id = r.game_id "
+        "WHERE r.source_id IN ({games}) OR r.game_id IN ({games}) "
+        "GROUP BY d.developer) n ON n.developer = s.developer "
+        "SET s.num_reviews = s.num_reviews - n.num_reviews",
+    ),
+    "sqlite": (
+        "UPDATE genre_stats SET "
+        "num_games = genre_stats.num_games - n.num_games, "
+        "rating_count = genre_stats.rating_count - n.rating_count, "
+        "rating_sum = genre_stats.rating_sum - n.rating_sum FROM ("
+        "SELECT g.genre_name, COUNT(*) AS num_games, COUNT(v.rating) AS rating_count, "
+        "COALESCE(SUM(v.rating), 0) AS rating_sum "
+        "FROM {genre_is} g JOIN videogames v ON v.game_id = g.game_id "
+        "WHERE g.game_id IN ({games}) "
+        "GROUP BY g.genre_name) AS n WHERE n.genre_name = genre_stats.genre_name",
+        "UPDATE developer_stats SET "
+        "num_games = developer_stats.num_games - n.num_games, "
+        "rating_count = developer_stats.rating_count - n.rating_count, "
+        "rating_sum = developer_stats.rating_sum - n.rating_sum FROM ("
+        "SELECT d.developer, COUNT(*) AS num_games, COUNT(v.rating) AS rating_count, "
+        "COALESCE(SUM(v.rating), 0) AS rating_sum "
+        "FROM {developed_by} d JOIN videogames v ON v.game_id = d.game_id "
+        "WHERE d.game_id IN ({games}) "
+        "GROUP BY d.developer) AS n WHERE n.developer = developer_stats.developer",
+        "UPDATE developer_stats SET num_reviews = developer_stats.num_reviews - n.num_reviews FROM ("
+        "SELECT d.developer, COUNT(*) AS num_reviews "
+        "FROM reviews r JOIN {developed_by} d ON d.game_id = r.game_id "
+        "WHERE r.source_id IN ({games}) OR r.game_id IN ({games}) "
+        "GROUP BY d.developer) AS n WHERE n.developer = developer_stats.developer",
+    ),
+}
+# Only the developers of deleted games can lose a genre, so their pairs are recomputed from the games they have left
+regroup_statements = (
+    "DELETE FROM developer_genres WHERE developer IN ({developers})",
+    "INSERT INTO developer_genres(developer, genre_name) "
+    "SELECT DISTINCT d.developer, g.genre_name "
+    "FROM {developed_by} d JOIN {genre_is} g ON g.game_id = d.game_id "
+    "WHERE d.developer IN ({developers})",
+    "UPDATE developer_stats SET num_genres = ("
+    "SELECT COUNT(*) FROM developer_genres dg WHERE dg.developer = developer_stats.developer) "
+    "WHERE developer IN ({developers})",
+)
+
+
+def update_rollups(
+    cursor, game_ids: list = None, review_watermark: int = None, compact: bool = False, backend: str = "mysql"
+):
+    if game_ids is None:
+        games, games_data = "SELECT game_id FROM videogames", ()
+    else:
+        games, games_data = ", ".join(["%s"] * len(game_ids)), tuple(game_ids)
+    if game_ids is None or game_ids:
+        for statement in rollup_statements[backend]:
+            cursor.execute(statement.format(games=games, **relations[compact]), games_data)
+    # Reviews are counted by id, so those re-pointed to an earlier game are included too
+    if review_watermark is not None:
+        cursor.execute(review_rollup_statements[backend].format(**relations[compact]), (review_watermark,))
+
+
+def retract_rollups(cursor, game_ids: tuple, compact: bool = False, backend: str = "mysql") -> set:
+    games = ", ".join(["%s"] * len(game_ids))
+    for statement in retract_statements[backend]:
+        cursor.execute(statement.format(games=games, **relations[compact]), game_ids * statement.count("{games}"))
+    cursor.execute(
+        f"SELECT DISTINCT d.developer FROM {relations[compact]['developed_by']} d WHERE d.game_id IN ({games})",
+        game_ids,
+    )
+    return {developer for (developer,) in cursor.fetchall()}
+
+
+def regroup_developers(cursor, developers: list, compact: bool = False):
+    placeholders = ", ".join(["%s"] * len(developers))
+    for statement in regroup_statements:
+        cursor.execute(statement.format(developers=placeholders, **relations[compact]), tuple(developers))
+
+
+def rebuild_rollups(cursor, compact: bool = False, backend: str = "mysql"):
+    cursor.execute("DELETE FROM developer_genres")
+    cursor.execute("DELETE FROM developer_stats")
+    cursor.execute("DELETE FROM genre_stats")
+    update_rollups(cursor, review_watermark=0, compact=compact, backend=backend)
+
+
+compact_checks = {
+    "mysql": (
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = 'popular_videogames' AND table_name = 'developers' AND column_name = 'id'"
+    ),
+    "sqlite": "SELECT COUNT(*) FROM pragma_table_info('developers') WHERE name = 'id'",
+}
+
+
+def compact_schema(cursor, backend: str = "mysql") -> bool:
+    cursor.execute(compact_checks[backend])
+    return cursor.fetchone()[0] > 0
+
+
+class BulkLoader:
+    tables = ("videogames", "developers", "genre", "developed_by", "genre_is", "reviews", "source_rows")
+    statements = {
+        "videogames": (
+            "INSERT INTO videogames(game_id, game_title, release_date, rating, times_listed, number_of_reviews, summary, plays, playing, backlogs, wishlist) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+        ),
+        "developers": "INSERT IGNORE INTO developers(name) VALUES (%s)",
+        "genre": "INSERT IGNORE INTO genre(name) VALUES (%s)",
+        "developed_by": "INSERT INTO developed_by(developer, game_id) VALUES (%s, %s)",
+        "genre_is": "INSERT INTO genre_is(game_id, genre_name) VALUES (%s, %s)",
+        "reviews": "INSERT IGNORE INTO reviews(content, content_hash, game_id, source_id) VALUES (%s, %s, %s, %s)",
+        "source_rows": "INSERT INTO source_rows(game_id, row_hash, target_id) VALUES (%s, %s, %s)",
+    }
+    compact_statements = {
+        "developers": "INSERT INTO developers(id, name) VALUES (%s, %s)",
+        "genre": "INSERT INTO genre(id, name) VALUES (%s, %s)",
+        "developed_by": "INSERT INTO developed_by(developer_id, game_id) VALUES (%s, %s)",
+        "genre_is": "INSERT INTO genre_is(game_id, genre_id) VALUES (%s, %s)",
+    }
+    sqlite_statements = {
+        # MySQL rounds a fractional rating stored in an INT column, SQLite would keep the fraction
+        "videogames": (
+            "INSERT INTO videogames(game_id, game_title, release_date, rating, times_listed, number_of_reviews, summary, plays, playing, backlogs, wishlist) "
+            "VALUES (%s, %s, %s, ROUND(%s), %s, %s, %s, %s, %s, %s, %s)"
+        ),
+        "developers": "INSERT OR IGNORE INTO developers(name) VALUES (%s)",
+        "genre": "INSERT OR IGNORE INTO genre(name) VALUES (%s)",
+        "reviews": "INSERT OR IGNORE INTO reviews(content, content_hash, game_id, source_id) VALUES (%s, %s, %s, %s)",
+    }
+    preload_statements = {
+        "mysql": "SELECT game_title, UNHEX(SHA1(CONVERT(summary USING utf8mb4))), game_id FROM videogames ",
+        "sqlite": "SELECT game_title, UNHEX(SHA1(summary)), game_id FROM videogames ",
+    }
+
+    def __init__(self, db_conn, cursor, batch_size: int = 1000, compact: bool = False, backend: str = "mysql"):
+        self.db_conn = db_conn
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.compact = compact
+        self.backend = backend
+        self.statements = {
+            **self.statements,
+            **(self.sqlite_statements if backend == "sqlite" else {}),
+            **(self.compact_statements if compact else {}),
+        }
+        self.buffers = {table: [] for table in self.tables}
+        self.rows = {table: 0 for table in self.tables}
+        self.seconds = {table: 0.0 for table in self.tables}
+        self.rollup_seconds = 0.0
+        # Collation key of a name -> key used by the junction tables: the name itself, or its id in the compact schema.
+        # Spellings the server considers equal share a key, as they share a row of developers or genre
+        self.developer_keys = {}
+        self.genre_keys = {}
+        self.load_keys()
+        self.next_ids = {
+            "developers": max(self.developer_keys.values(), default=0) + 1,
+            "genre": max(self.genre_keys.values(), default=0) + 1,
+        }
+        # game_title -> [(summary hash, game_id), ...] of the games already loaded
+        self.title_index = {}
+        # game_id and the first 64 bits of the content hash of every review loaded, packed into one int
+        self.review_keys = set()
+        self.duplicate_reviews = 0
+        self.pending_rows = 0
+
+    def load_keys(self):
+        if self.compact:
+            self.cursor.execute("SELECT name, id FROM developers")
+            self.developer_keys = {collation_key(name): key for name, key in self.cursor.fetchall()}
+            self.cursor.execute("SELECT name, id FROM genre")
+            self.genre_keys = {collation_key(name): key for name, key in self.cursor.fetchall()}
+
+    def preload_titles(self, titles: set):
+        # Only the titles about to be loaded matter, and the summaries are hashed on the server
+        titles = list(titles)
+        for position in range(0, len(titles), self.batch_size):
+            chunk = titles[position : position + self.batch_size]
+            self.cursor.execute(
+                self.preload_statements[self.backend] + f"WHERE game_title IN ({', '.join(['%s'] * len(chunk))})",
+                tuple(chunk),
+            )
+            game_ids = []
+            for game_title, summary_hash, game_id in self.cursor.fetchall():
+                self.title_index.setdefault(game_title, []).append((bytes(summary_hash), game_id))
+                game_ids.append(game_id)
+            if game_ids:
+                # Duplicates of these games may bring reviews that are stored already
+                self.cursor.execute(
+                    f"SELECT game_id, content_hash FROM reviews WHERE game_id IN ({', '.join(['%s'] * len(game_ids))})",
+                    tuple(game_ids),
+                )
+                for game_id, content_hash in self.cursor.fetchall():
+                    self.review_keys.add(self.review_key(game_id, bytes(content_hash)))
+
+    def find_duplicate(self, game_title: str, summary: str):
+        summary_hash = hashlib.sha1(summary.encode()).digest()
+        for indexed_hash, game_id in self.title_index.get(game_title, ()):
+            if indexed_hash == summary_hash:
+                return game_id
+        return None
+
+    def add_videogame(self, videogame_data: tuple, developers: list, genres: list, reviews: list, row_hash: bytes):
+        game_id, game_title, summary = videogame_data[0], videogame_data[1], videogame_data[6]
+        self.buffers["videogames"].append(videogame_data)
+        summary_hash = hashlib.sha1(summary.encode()).digest()
+        self.title_index.setdefault(game_title, []).append((summary_hash, game_id))
+
+        for developer in developers:
+            self.buffers["developed_by"].append((self.key_for(developer, self.developer_keys, "developers"), game_id))
+
+        for genre in genres:
+            self.buffers["genre_is"].append((game_id, self.key_for(genre, self.genre_keys, "genre")))
+
+        self.add_reviews(reviews, game_id, game_id)
+        self.add_source_row(game_id, row_hash, game_id)
+
+    def key_for(self, name: str, keys: dict, table: str):
+        key = keys.get(collation_key(name))
+        if key is None:
+            if self.compact:
+                # Ids are handed out here, so resolving a name never needs a round trip
+                key = self.next_ids[table]
+                self.next_ids[table] += 1
+                self.buffers[table].append((key, name))
+            else:
+                key = name
+                self.buffers[table].append((name,))
+            keys[collation_key(name)] = key
+        return key
+
+    def add_duplicate(self, videogame_data: tuple, reviews: list, row_hash: bytes, game_id: int):
+        self.add_reviews(reviews, game_id, videogame_data[0])
+        self.add_source_row(videogame_data[0], row_hash, game_id)
+
+    @staticmethod
+    def review_key(game_id: int, content_hash: bytes) -> int:
+        return game_id << 64 | int.from_bytes(content_hash[:8], "big")
+
+    def add_reviews(self, reviews: list, game_id: int, source_id: int):
+        for review in reviews:
+            content_hash = hashlib.sha1(review.encode()).digest()
+            key = self.review_key(game_id, content_hash)
+            if key in self.review_keys:
+                self.duplicate_reviews += 1
+                continue
+            self.review_keys.add(key)
+            self.buffers["reviews"].append((review, content_hash, game_id, source_id))
+
+    def add_source_row(self, source_id: int, row_hash: bytes, target_id: int):
+        # Written in the same transaction as the row's data, so a committed fingerprint is a checkpoint
+        self.buffers["source_rows"].append((source_id, row_hash, target_id))
+        self.pending_rows += 1
+        if self.pending_rows >= self.batch_size:
+            self.commit()
+
+    def flush(self):
+        game_ids = [videogame_data[0] for videogame_data in self.buffers["videogames"]]
+        review_watermark = None
+        if self.buffers["reviews"]:
+            self.cursor.execute("SELECT COALESCE(MAX(id), 0) FROM reviews")
+            review_watermark = self.cursor.fetchone()[0]
+
+        # Parents are written before the tables that reference them
+        for table in self.tables:
+            buffer = self.buffers[table]
+            if not buffer:
+                continue
+            start = time.perf_counter()
+            self.cursor.executemany(self.statements[table], buffer)
+            seconds = time.perf_counter() - start
+            self.seconds[table] += seconds
+            self.rows[table] += len(buffer)
+            metrics.record("loader.statement", seconds, table=table)
+            metrics.count("loader.rows", len(buffer), table=table)
+            buffer.clear()
+
+        start = time.perf_counter()
+        update_rollups(self.cursor, game_ids, review_watermark, self.compact, self.backend)
+        seconds = time.perf_counter() - start
+        self.rollup_seconds += seconds
+        metrics.record("loader.rollups", seconds)
+
+    def commit(self):
+        self.flush()
+        with metrics.timer("loader.commit"):
+            self.db_conn.commit()
+        self.pending_rows = 0
+
+    def stats(self) -> dict:
+        return {
+            "tables": {table: {"rows": self.rows[table], "seconds": self.seconds[table]} for table in self.tables},
+            "rollup_seconds": self.rollup_seconds,
+            "duplicate_reviews": self.duplicate_reviews,
+        }
+
+    def report(self):
+        for table in self.tables:
+            rows, seconds = self.rows[table], self.seconds[table]
+            rate = rows / seconds if seconds > 0 else 0.0
+            print(f"{table}: {rows} row(s) in {seconds:.2f}s ({rate:.0f} rows/s)")
+        print(f"{self.duplicate_reviews} duplicate review(s) have been skipped.")
+        print(f"Summary tables updated in {self.rollup_seconds:.2f}s.")
+
+
+def row_fingerprint(record: tuple) -> bytes:
+    return hashlib.sha1(repr(record).encode()).digest()
+
+
+def ingest(loader: BulkLoader, records) -> tuple:
+    rows_read, rows_inserted = 0, 0
+    skipped_rows = 0
+    duplicate_check_seconds = 0.0
+    for record in records:
+        videogame_data, developers, genres, reviews = record
+        rows_read += 1
+        game_title, summary = videogame_data[1], videogame_data[6]
+        row_hash = row_fingerprint(record)
+
+        if metrics.enabled:
+            check_start = time.perf_counter()
+            duplicate_of = loader.find_duplicate(game_title, summary)
+            duplicate_check_seconds += time.perf_counter() - check_start
+        else:
+            duplicate_of = loader.find_duplicate(game_title, summary)
+        if duplicate_of is not None:
+            loader.add_duplicate(videogame_data, reviews, row_hash, duplicate_of)
+            skipped_rows += 1
+            continue
+
+        loader.add_videogame(videogame_data, developers, genres, reviews, row_hash)
+        rows_inserted += 1
+
+    metrics.record("loader.duplicate_check", duplicate_check_seconds, count=rows_read)
+    return rows_read, rows_inserted, skipped_rows
+
+
+def plan_incremental(cursor, read_records) -> tuple:
+    cursor.execute("SELECT game_id, row_hash, target_id FROM source_rows")
+    fingerprints = {game_id: (bytes(row_hash), target_id) for game_id, row_hash, target_id in cursor.fetchall()}
+
+    changes = {"unchanged": 0, "new": 0, "changed": 0, "removed": 0, "reattached": 0}
+    # Only the ids of the rows to load are kept, so planning stays bounded however much of the source changed
+    pending = set()
+    seen = set()
+    for record in read_records():
+        game_id = record[0][0]
+        seen.add(game_id)
+        known = fingerprints.get(game_id)
+        if known is None:
+            changes["new"] += 1
+        elif known[0] != row_fingerprint(record):
+            changes["changed"] += 1
+        else:
+            changes["unchanged"] += 1
+            continue
+        pending.add(game_id)
+
+    outdated = pending & fingerprints.keys()
+    removed = fingerprints.keys() - seen
+    changes["removed"] = len(removed)
+
+    # Duplicates hang their reviews on another row's game and a repeated review is only stored for the first
+    # row that brings it, so every row of a game touched by a change is loaded again, in file order
+    replaced_games = {fingerprints[game_id][1] for game_id in outdated | removed}
+    reattached = {
+        game_id
+        for game_id, (_, target_id) in fingerprints.items()
+        if target_id in replaced_games and game_id not in outdated and game_id not in removed
+    }
+    changes["reattached"] = len(reattached)
+    changes["stale"] = sorted(outdated | removed | reattached)
+    return pending | reattached, changes
+
+
+def preloaded(loader: BulkLoader, records):
+    # The games already stored under the titles of a batch are looked up just before the batch is checked for duplicates
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, loader.batch_size))
+        if not batch:
+            return
+        loader.preload_titles({record[0][1] for record in batch})
+        yield from batch
+
+
+orphan_statements = {
+    False: (
+        "DELETE FROM developers WHERE name NOT IN (SELECT developer FROM developed_by)",
+        "DELETE FROM genre WHERE name NOT IN (SELECT genre_name FROM genre_is)",
+    ),
+    True: (
+        "DELETE FROM developers WHERE id NOT IN (SELECT developer_id FROM developed_by)",
+        "DELETE FROM genre WHERE id NOT IN (SELECT genre_id FROM genre_is)",
+    ),
+}
+
+
+def delete_source_rows(loader: BulkLoader, source_ids: list):
+    cursor = loader.cursor
+    developers = set()
+    for position in range(0, len(source_ids), loader.batch_size):
+        chunk = tuple(source_ids[position : position + loader.batch_size])
+        placeholders = ", ".join(["%s"] * len(chunk))
+        # Applied in the same transaction as the deletions, so the rollups match what is left even if the load stops
+        # before the changed rows are back, and the batches loaded next add to them as usual
+        developers |= retract_rollups(cursor, chunk, loader.compact, loader.backend)
+        cursor.execute(f"DELETE FROM reviews WHERE source_id IN ({placeholders})", chunk)
+        cursor.execute(f"DELETE FROM videogames WHERE game_id IN ({placeholders})", chunk)
+        cursor.execute(f"DELETE FROM source_rows WHERE game_id IN ({placeholders})", chunk)
+    # Names left without games go, and their rollup rows with them through ON DELETE CASCADE
+    for statement in orphan_statements[loader.compact]:
+        cursor.execute(statement)
+    developers = sorted(developers)
+    for position in range(0, len(developers), loader.batch_size):
+        regroup_developers(cursor, developers[position : position + loader.batch_size], loader.compact)
+    loader.db_conn.commit()
+    # Ids of the deleted names must not be handed to the rows loaded next
+    loader.load_keys()
+
+
+def insert_data(
+    pool: ConnectionPool,
+    path="./games.csv",
+    batch_size: int = 1000,
+    workers: int = None,
+    vectorized: bool = False,
+    incremental: bool = False,
+    use_mmap: bool = False,
+) -> dict:
+    # Shards go through one loader in order, so a duplicate title is recognized whichever shard brought the first copy
+    paths = source_paths(path)
+    shard_stats = {}
+
+    def read_records():
+        if vectorized:
+            import columnar
+
+            chunks = columnar.parsed_chunks(paths, use_mmap=use_mmap)
+        else:
+            chunks = parsed_chunks(paths, workers, use_mmap=use_mmap)
+        return shard_throughput(chunks, paths, shard_stats)
+
     try:
-        with mysql.connect(host="localhost", user=user, passwd=password, database="popular_videogames") as db_conn:
+        with pool.connection() as db_conn:
             with db_conn.cursor() as cursor:
-                with open("./games.csv") as file:
-                    dataset = csv.reader(file, delimiter=",")
-                    next(dataset)
-                    rows_read, rows_inserted = 0, 0
-                    skipped_rows = 0
-                    all_game_titles = set()
-                    for row in dataset:
-                        rows_read += 1
-                        skip_to_next_row = False
-                        # Primary Key
-                        game_id = int(row[0])
-
-                        # String Values
-                        game_title = row[1]
-                        summary = row[8]
-
-                        # Date
-                        release_date = date_convert(row[2])
-
-                        # Numerical Values
-                        rating = num_variable_processing(row[4])
-                        times_listed = num_variable_processing(row[5])
-                        num_reviews = num_variable_processing(row[6])
-                        plays = num_variable_processing(row[10])
-                        playing = num_variable_processing(row[11])
-                        backlogs = num_variable_processing(row[12])
-                        wishlist = num_variable_processing(row[13])
-
-                        # (Potential) Multivalued Attributes
-                        developers = multivalued_processing(row[3])
-                        genres = multivalued_processing(row[7])
-                        reviews = multivalued_processing(row[9])
-
-                        if game_title in all_game_titles:
-                            compare_summary = "SELECT summary, game_id " "FROM videogames " "WHERE game_title = %s;"
-                            compare_summary_data = (game_title,)
-                            cursor.execute(compare_summary, compare_summary_data)
-                            result = cursor.fetchall()
-                            for row in result:
-                                summary_from_database = row[0]
-                                game_id_from_database = row[1]
-                                if summary_from_database == summary:
-                                    skip_to_next_row = True
-                                    for review in reviews:
-                                        try:
-                                            insert_review = "INSERT INTO reviews(content, game_id) VALUES (%s, %s)"
-                                            review_data = (review, game_id_from_database)
-                                            cursor.execute(insert_review, review_data)
-                                        except mysql.Error as err:
-                                            if err.errno != 1062:
-                                                print(f"Error: {err}")
-
-                        if skip_to_next_row:
-                            skipped_rows += 1
-                            continue
-
-                        insert_videogame = (
-                            "INSERT INTO videogames(game_id, game_title, release_date, rating, times_listed, number_of_reviews, summary, plays, playing, backlogs, wishlist)"
-                            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
-                        )
-                        videogame_data = (
-                            game_id,
-                            game_title,
-                            release_date,
-                            rating,
-                            times_listed,
-                            num_reviews,
-                            summary,
-                            plays,
-                            playing,
-                            backlogs,
-                            wishlist,
+                loader = BulkLoader(db_conn, cursor, batch_size, compact_schema(cursor, pool.backend), pool.backend)
+                start = time.perf_counter()
+                changes = None
+                if incremental:
+                    reload, changes = plan_incremental(cursor, read_records)
+                    if changes["stale"]:
+                        delete_source_rows(loader, changes["stale"])
+                    # The rows to load are read a second time and picked out as they stream past
+                    records = []
+                    if reload:
+                        records = preloaded(loader, (record for record in read_records() if record[0][0] in reload))
+                else:
+                    records = read_records()
+
+                rows_read, rows_inserted, skipped_rows = ingest(loader, records)
+                loader.commit()
+                if loader.backend == "sqlite":
+                    # SQLite only plans joins with table statistics once it is told to gather them
+                    cursor.execute("ANALYZE")
+                    db_conn.commit()
+                cache.results.bump_version()
+                elapsed = time.perf_counter() - start
+                metrics.record("loader.total", elapsed)
+
+                if changes:
+                    print(
+                        f"{changes['unchanged']} unchanged, {changes['new']} new, {changes['changed']} changed "
+                        f"and {changes['removed']} removed row(s) found in the source."
+                    )
+                    print(f"{changes['reattached']} duplicate row(s) have been reloaded with the games they belong to.")
+                print(f"{rows_read} row(s) have been read successfully.")
+                print(f"{rows_inserted} distinct row(s) have been inserted successfully.")
+                print(f"{skipped_rows} row(s) have been skipped because of duplicated data.")
+                print(f"Loaded in {elapsed:.2f}s ({rows_read / elapsed if elapsed > 0 else 0:.0f} source rows/s).")
+                if len(paths) > 1:
+                    # An incremental load times the pass that compares every row with its fingerprint
+                    for shard_path, shard in shard_stats.items():
+                        seconds = shard["seconds"]
+                        print(
+                            f"{shard_path}: {shard['rows']} row(s) in {seconds:.2f}s "
+                            f"({shard['rows'] / seconds if seconds > 0 else 0:.0f} rows/s, "
+                            f"{shard['bytes'] / (1024 * 1024) / seconds if seconds > 0 else 0:.1f} MB/s read)"
                         )
-                        cursor.execute(insert_videogame, videogame_data)
-                        all_game_titles.add(game_title)
-
-                        for developer in developers:
-                            try:
-                                insert_developer = "INSERT INTO developers(name) VALUES (%s)"
-                                dev_data = (developer,)
-                                cursor.execute(insert_developer, dev_data)
-                            except mysql.Error as err:
-                                if err.errno != 1062:
-                                    print(f"Error: {err}")
-
-                            relate_dev_to_game = "INSERT INTO developed_by(developer, game_id) VALUES (%s, %s)"
-                            dev_to_game_data = (developer, game_id)
-                            cursor.execute(relate_dev_to_game, dev_to_game_data)
-
-                        for genre in genres:
-                            try:
-                                insert_genre = "INSERT INTO genre(name) VALUES (%s)"
-                                genre_data = (genre,)
-                                cursor.execute(insert_genre, genre_data)
-                            except mysql.Error as err:
-                                if err.errno != 1062:
-                                    print(f"Error: {err}")
-
-                            relate_genre_to_game = "INSERT INTO genre_is(game_id, genre_name) VALUES (%s, %s)"
-                            genre_to_game_data = (game_id, genre)
-                            cursor.execute(relate_genre_to_game, genre_to_game_data)
-
-                        for review in reviews:
-                            insert_review = "INSERT INTO reviews(content, game_id) VALUES (%s, %s)"
-                            review_data = (review, game_id)
-                            cursor.execute(insert_review, review_data)
-
-                        rows_inserted += 1
-
-                    print(f"{rows_read} row(s) have been read successfully.")
-                    print(f"{rows_inserted} distinct row(s) have been inserted successfully.")
-                    print(f"{skipped_rows} row(s) have been skipped because of duplicated data.")
-
-            db_conn.commit()
+                loader.report()
+
+                return {
+                    "rows_read": rows_read,
+                    "rows_inserted": rows_inserted,
+                    "skipped_rows": skipped_rows,
+                    "seconds": elapsed,
+                    "changes": changes,
+                    "shards": shard_stats,
+                    **loader.stats(),
+                }
 
     except mysql.Error as err:
         print(f"Error: {err}")
 
 
-def resetdb(user: str, password: str):
+def resetdb(pool: ConnectionPool):
     try:
-        with mysql.connect(host="localhost", user=user, passwd=password, database="popular_videogames") as db_conn:
-            with db_conn.cursor() as cursor:
-                cursor.execute("DROP DATABASE popular_videogames")
+        if pool.backend == "sqlite":
+            pool.drop_database()
+        else:
+            with pool.connection(database=False) as db_conn:
+                with db_conn.cursor() as cursor:
+                    cursor.execute("DROP DATABASE IF EXISTS popular_videogames")
+            pool.forget_database()
+        cache.results.bump_version()
     except mysql.Error as err:
-        if err.errno != 1049:
-            print(f"Error: {err}")
+        print(f"Error: {err}")
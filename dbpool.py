@@ -0,0 +1,131 @@
+import functools
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from mysql.connector import pooling
+
+DATABASE = "popular_videogames"
+
+
+@functools.lru_cache(maxsize=65536)
+def collation_key(text: str) -> str:
+    # Close to utf8mb4_0900_ai_ci, the server's default: accents and case are ignored, trailing spaces are not
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class ConnectionPool:
+    backend = "mysql"
+
+    def __init__(
+        self,
+        user: str,
+        password: str,
+        size: int = 5,
+        host: str = None,
+        option_files: str = None,
+    ):
+        self.size = size
+        # Values given here win over the option file, and the ones left out are read from it
+        if host is None and not option_files:
+            host = "localhost"
+        credentials = {"host": host, "user": user, "passwd": password}
+        credentials = {name: value for name, value in credentials.items() if value is not None}
+        if option_files:
+            credentials["option_files"] = option_files
+        # Tells this server's cached results apart from those of another server or backend
+        self.database = f"{host or option_files}/{DATABASE}"
+        start = time.perf_counter()
+        # Sessions are not reset on checkout, so each connection keeps its default database
+        self.pool = pooling.MySQLConnectionPool(
+            pool_name=DATABASE,
+            pool_size=size,
+            pool_reset_session=False,
+            **credentials,
+        )
+        self.connect_seconds = (time.perf_counter() - start) / size
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.on_database = set()
+        # Physical connection -> server thread id of the session it held at its last checkout
+        self.sessions = {}
+        # Physical connection -> {SQL text: cursor holding that statement prepared on the server}
+        self.statements = {}
+        self.checkouts = 0
+        self.connects = size
+        self.reconnects = 0
+        self.prepares = 0
+        self.prepared_reuses = 0
+
+    @contextmanager
+    def connection(self, database: bool = True):
+        # Waits for a free connection instead of failing when every connection is checked out
+        with self.slots:
+            db_conn = self.pool.get_connection()
+            key = id(getattr(db_conn, "_cnx", db_conn))
+            try:
+                self.check_session(db_conn, key)
+                if database and key not in self.on_database:
+                    db_conn.cmd_init_db(DATABASE)
+                    self.on_database.add(key)
+                with self.lock:
+                    self.checkouts += 1
+                yield db_conn
+            finally:
+                if db_conn.is_connected() and db_conn.in_transaction:
+                    db_conn.rollback()
+                db_conn.close()
+
+    def check_session(self, db_conn, key: int):
+        # get_connection() pings every connection and quietly reconnects a dead one, without the database
+        session = db_conn.connection_id
+        previous = self.sessions.get(key)
+        self.sessions[key] = session
+        if previous is None or previous == session:
+            return
+        self.on_database.discard(key)
+        # Prepared statements die with the session
+        self.statements.pop(key, None)
+        with self.lock:
+            self.connects += 1
+            self.reconnects += 1
+
+    def prepared_cursor(self, db_conn, sql: str):
+        statements = self.statements.setdefault(id(getattr(db_conn, "_cnx", db_conn)), {})
+        cursor = statements.get(sql)
+        with self.lock:
+            if cursor is None:
+                cursor = statements[sql] = db_conn.cursor(prepared=True)
+                self.prepares += 1
+            else:
+                self.prepared_reuses += 1
+        return cursor
+
+    def forget_database(self):
+        # After DROP DATABASE every connection selects it again on its next checkout
+        self.on_database.clear()
+
+    def stats(self) -> dict:
+        reused = self.checkouts - self.connects
+        return {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "reused": max(reused, 0),
+            "saved_seconds": max(reused, 0) * self.connect_seconds,
+            "prepared_statements": self.prepares,
+            "prepared_reuses": self.prepared_reuses,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"Connection pool: {stats['checkouts']} checkout(s), {stats['connects']} connect(s), "
+            f"{stats['reconnects']} reconnect(s), {stats['reused']} reuse(s) saving about "
+            f"{stats['saved_seconds'] * 1000:.0f} ms of connection setup."
+        )
+        print(
+            f"Prepared statements: {stats['prepared_statements']} prepared, "
+            f"{stats['prepared_reuses']} execution(s) reused one."
+        )
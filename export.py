@@ -0,0 +1,136 @@
+import contextlib
+import datetime
+import decimal
+import json
+import sys
+from mysql.connector import FieldType
+import metrics
+import queries
+from dbpool import ConnectionPool
+
+formats = ["csv", "jsonl", "parquet", "arrow"]
+
+integer_types = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.INT24, FieldType.LONGLONG, FieldType.YEAR}
+float_types = {FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL}
+date_types = {FieldType.DATE, FieldType.NEWDATE}
+timestamp_types = {FieldType.DATETIME, FieldType.TIMESTAMP}
+
+
+def arrow_schema(description: list, rows: list):
+    import pyarrow as pa
+
+    # Taken from the cursor description, so a chunk that happens to be all NULLs can't change a column's type
+    fields = []
+    for position, column in enumerate(description):
+        name, type_code = column[0], column[1]
+        if type_code is None:
+            # SQLite types values, not columns, so its columns take the type of the first chunk's values
+            arrow_type = pa.array([row[position] for row in rows]).type
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.string()
+        elif type_code in integer_types:
+            arrow_type = pa.int64()
+        elif type_code in float_types:
+            arrow_type = pa.float64()
+        elif type_code in date_types:
+            arrow_type = pa.date32()
+        elif type_code in timestamp_types:
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def record_batch(schema, rows: list):
+    import pyarrow as pa
+
+    columns = zip(*rows) if rows else [()] * len(schema)
+    arrays = []
+    for field, values in zip(schema, columns):
+        # AVG() and divisions come back as Decimal
+        if pa.types.is_floating(field.type):
+            values = [None if value is None else float(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def json_value(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode()
+    raise TypeError(f"{type(value).__name__} can't be exported.")
+
+
+def write_jsonl(chunks, output: str) -> int:
+    file = sys.stdout if output == "-" else open(output, "w")
+    total_rows = 0
+    try:
+        for description, rows in chunks:
+            columns = [column[0] for column in description]
+            for row in rows:
+                file.write(json.dumps(dict(zip(columns, row)), default=json_value) + "\n")
+            total_rows += len(rows)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    return total_rows
+
+
+def write_arrow(chunks, output: str, export_format: str) -> int:
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.parquet
+
+    sink = sys.stdout.buffer if output == "-" else output
+    writer = None
+    total_rows = 0
+    try:
+        for description, rows in chunks:
+            if writer is None:
+                schema = arrow_schema(description, rows)
+                if export_format == "csv":
+                    writer = pa.csv.CSVWriter(sink, schema)
+                elif export_format == "parquet":
+                    writer = pa.parquet.ParquetWriter(sink, schema)
+                elif output == "-":
+                    # A pipe can't be seeked back to write the file footer
+                    writer = pa.ipc.new_stream(sink, schema)
+                else:
+                    writer = pa.ipc.new_file(sink, schema)
+            # Each chunk becomes one record batch, which the writers take without another copy
+            writer.write_batch(record_batch(schema, rows))
+            total_rows += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+    return total_rows
+
+
+def export_query(
+    pool: ConnectionPool,
+    category: str,
+    query: str,
+    export_format: str,
+    output: str = "-",
+    params: dict = None,
+    chunk_size: int = 10000,
+) -> int:
+    if export_format not in formats:
+        raise ValueError(f"{export_format} isn't one of {', '.join(formats)}.")
+    if category == "performance":
+        raise ValueError("Query plans are printed, not exported.")
+    if export_format == "parquet" and output == "-":
+        raise ValueError("Parquet needs an output file.")
+    # Closed explicitly, so a failed write hands the connection back to the pool straight away
+    with contextlib.closing(queries.stream_query(pool, category, query, chunk_size, params, describe=True)) as chunks:
+        with metrics.timer("export.write", format=export_format):
+            if export_format == "jsonl":
+                total_rows = write_jsonl(chunks, output)
+            else:
+                total_rows = write_arrow(chunks, output, export_format)
+    metrics.count("export.rows", total_rows, format=export_format)
+    return total_rows
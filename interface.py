@@ -1,6 +1,9 @@
 from getpass import getpass
 import mysql.connector as mysql
-import dbhandling, queries
+import pandas as pd
+import dbhandling, metrics, queries
+from dbpool import ConnectionPool
+from sqlitepool import SQLitePool
 
 
 def print_text(level: int, text: str):
@@ -20,31 +23,91 @@ def print_text(level: int, text: str):
         print("\n", text)
 
 
-def select_category() -> str:
+def select_category(pool: ConnectionPool) -> str:
     print_text(2, "Database Querying")
-    query_categories = queries.query_categories()
+    query_categories = queries.available_categories(pool)
     print_text(3, "Query Categories")
     for idx, category in enumerate(query_categories):
         print(f"{idx+1}.   Queries about the {category}")
+    print(f"{len(query_categories)+1}.   Report running the whole catalog at once")
     print(f"0.   Close program")
     category_choice = int(
         input("\n> Please indicate the number of the category you want to explore: ")
     )
     if category_choice == 0:
         return 0
+    if category_choice == len(query_categories) + 1:
+        return "report"
     return query_categories[category_choice - 1]
 
 
-def select_query(category: str) -> str:
+def select_query(category: str) -> tuple:
     print_text(3, f"Queries About The {category.capitalize()}")
     query_options = queries.queries_inside(category)
     for idx, query in enumerate(query_options):
         print(f"{idx+1}.   {query}")
+    if category != "performance":
+        print(f"{len(query_options)+1}.   Report running every query above at once")
     print(f"0.   Go back")
     query_choice = int(input("\n> Please indicate the number of the query to execute: "))
     if query_choice == 0:
-        return 0
-    return query_options[query_choice - 1]
+        return 0, None
+    if query_choice == len(query_options) + 1 and category != "performance":
+        return "report", None
+    query = query_options[query_choice - 1]
+    # Browsing asks for its own page size
+    if query in queries.browse_queries:
+        return query, None
+    return query, select_parameters(category, query)
+
+
+def select_parameters(category: str, query: str) -> dict:
+    params = {}
+    for name, (kind, default) in queries.query_parameters(category, query).items():
+        if name == "terms":
+            prompt = 'the search terms (+word to require it, -word to exclude it, "..." for a phrase)'
+        else:
+            prompt = f"{name.replace('_', ' ')} (press Enter for {default})"
+        while name not in params:
+            value = input(f"\n> Please type {prompt}: ").strip()
+            if value == "":
+                if default is not None:
+                    params[name] = default
+                continue
+            try:
+                params[name] = kind(value)
+            except ValueError:
+                print(f"\n{value} is not a valid {kind.__name__}.")
+    return params
+
+
+def browse_table(pool: ConnectionPool, table: str):
+    orders = queries.browse_tables[table]["orders"]
+    order = orders[0]
+    if len(orders) > 1:
+        for idx, column in enumerate(orders):
+            print(f"{idx+1}.   Sort by {column}")
+        order = orders[int(input("\n> Please indicate the number of the sort order: ")) - 1]
+    descending = False
+    while descending not in ("A", "D"):
+        descending = input("\n> Ascending or descending order? (A/D): ").capitalize()
+    page_size = input("\n> Please type the number of rows per page (press Enter for 10): ").strip()
+
+    browser = queries.TableBrowser(pool, table, order, descending == "D", int(page_size) if page_size else 10)
+    try:
+        columns, rows = browser.first()
+        while True:
+            print_text(3, f"Page {browser.page}")
+            print(pd.DataFrame(rows, columns=columns).to_string(index=False))
+            action = input("\n> Next page, previous page or stop browsing? (N/P/S): ").capitalize()
+            if action == "N":
+                columns, rows = browser.next()
+            elif action == "P":
+                columns, rows = browser.previous()
+            elif action == "S":
+                break
+    except mysql.Error as err:
+        print(f"Error: {err}")
 
 
 def main():
@@ -68,56 +131,92 @@ def main():
             "\n> Would you like to initialize the database from zero? (Y/N): "
         ).capitalize()
 
-    user, password = False, False
-    while user == False or password == False:
-        user = input("\n> Please type your MySQL server username: ")
-        password = getpass("\n> Please type your MySQL server password: ")
-        try:
-            db_conn = mysql.connect(host="localhost", user=user, passwd=password)
-            cursor = db_conn.cursor()
-
-        except mysql.Error as err:
-            if err.errno == 1045:
-                print(f"\nAuthentication Failed: {err}")
-                user, password = False, False
-            else:
-                print(f"\nError: {err}")
+    embedded = False
+    while embedded not in ("Y", "N"):
+        embedded = input(
+            "\n> Would you like to use the embedded SQLite database instead of a MySQL server? (Y/N): "
+        ).capitalize()
+
+    if embedded == "Y":
+        pool = SQLitePool()
+    else:
+        user, password = False, False
+        while user == False or password == False:
+            user = input("\n> Please type your MySQL server username: ")
+            password = getpass("\n> Please type your MySQL server password: ")
+            try:
+                pool = ConnectionPool(user, password)
+
+            except mysql.Error as err:
+                if err.errno == 1045:
+                    print(f"\nAuthentication Failed: {err}")
+                    user, password = False, False
+                else:
+                    print(f"\nError: {err}")
 
     if initialize == "N":
-        cursor.execute("SHOW DATABASES LIKE 'popular_videogames'")
-        database_exists = cursor.fetchone()
-        if not database_exists:
+        if not dbhandling.database_exists(pool):
             print("\nDatabase doesn't exist.")
             initialize = "Y"
 
+    if initialize == "N":
+        refresh = False
+        while refresh not in ("Y", "N"):
+            refresh = input(
+                "\n> Would you like to load the changes in games.csv (or resume an interrupted load)? (Y/N): "
+            ).capitalize()
+        if refresh == "Y":
+            print_text(4, "Loading changes...")
+            dbhandling.insert_data(pool, incremental=True)
+            print_text(4, "Checking summary tables...")
+            queries.check_rollups(pool)
+
     if initialize == "Y":
-        dbhandling.resetdb(user, password)
+        compact = False
+        while compact not in ("Y", "N"):
+            compact = input(
+                "\n> Would you like to key developers and genres by compact integer ids? (Y/N): "
+            ).capitalize()
+        dbhandling.resetdb(pool)
         print_text(4, "Creating database...")
-        dbhandling.createdb(user, password)
+        dbhandling.createdb(pool)
         print_text(4, "Creating tables...")
-        dbhandling.create_tables(user, password)
+        dbhandling.create_tables(pool, compact == "Y")
         print_text(4, "Inserting data...")
-        dbhandling.insert_data(user, password)
+        dbhandling.insert_data(pool)
+        print_text(4, "Checking summary tables...")
+        queries.check_rollups(pool)
 
     while True:
-        cat_choice = select_category()
+        cat_choice = select_category(pool)
         if cat_choice == 0:
             print_text(4, "Closing program...\n")
             break
-        query_choice = select_query(cat_choice)
+        if cat_choice == "report":
+            query_choice, params = "report", None
+        else:
+            query_choice, params = select_query(cat_choice)
         if query_choice == 0:
             continue
-        print_text(4, "Executing query...\n")
-        queries.execute_query(user, password, cat_choice, query_choice)
+        if query_choice == "report":
+            print_text(4, "Running the report...\n")
+            queries.run_report(pool, None if cat_choice == "report" else [cat_choice])
+        elif query_choice in queries.browse_queries:
+            browse_table(pool, queries.browse_queries[query_choice])
+        else:
+            print_text(4, "Executing query...\n")
+            queries.execute_query(
+                pool, cat_choice, query_choice, stream=queries.is_unbounded(cat_choice, query_choice), params=params
+            )
         print_text(3, "End of Query")
         retry = input("\n> Do you want to execute another query? (Y/N): ").capitalize()
         if retry != "Y":
             print_text(4, "Closing program...\n")
             break
 
-    db_conn.close()
-    cursor.close()
+    pool.report()
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.profile():
+        main()
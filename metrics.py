@@ -0,0 +1,168 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Read once at import; every hook checks this flag first so a disabled run pays a single attribute lookup
+enabled = os.environ.get("VIDEOGAMES_METRICS", "") not in ("", "0")
+
+lock = threading.Lock()
+timings = {}
+counters = {}
+null_timer = nullcontext()
+
+
+class Timer:
+    def __init__(self, name: str, labels: tuple):
+        self.key = (name, labels)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.key[0], time.perf_counter() - self.start, **dict(self.key[1]))
+
+
+def enable(export_path: str = None):
+    global enabled
+    enabled = True
+    if export_path:
+        atexit.register(export, export_path)
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    with lock:
+        timings.clear()
+        counters.clear()
+
+
+def timer(name: str, **labels):
+    if not enabled:
+        return null_timer
+    return Timer(name, tuple(sorted(labels.items())))
+
+
+def record(name: str, seconds: float, count: int = 1, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with lock:
+        stats = timings.get(key)
+        if stats is None:
+            timings[key] = [count, seconds, seconds]
+        else:
+            stats[0] += count
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+
+def count(name: str, value: int = 1, **labels):
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with lock:
+        counters[key] = counters.get(key, 0) + value
+
+
+def snapshot() -> dict:
+    with lock:
+        return {
+            "timings": [
+                {"name": name, "labels": dict(labels), "count": stats[0], "seconds": stats[1], "max_seconds": stats[2]}
+                for (name, labels), stats in sorted(timings.items())
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(counters.items())
+            ],
+        }
+
+
+def to_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def to_prometheus() -> str:
+    def metric_name(name: str) -> str:
+        return "videogames_" + name.replace(".", "_")
+
+    def label_text(labels: dict) -> str:
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for value in labels.values())
+        return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+    data = snapshot()
+    lines = []
+    declared = set()
+    for timing in data["timings"]:
+        name, labels = metric_name(timing["name"]) + "_seconds", label_text(timing["labels"])
+        if name not in declared:
+            lines.append(f"# TYPE {name} summary")
+            declared.add(name)
+        lines.append(f"{name}_count{labels} {timing['count']}")
+        lines.append(f"{name}_sum{labels} {timing['seconds']:.9f}")
+    for counter in data["counters"]:
+        name, labels = metric_name(counter["name"]) + "_total", label_text(counter["labels"])
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(f"{name}{labels} {counter['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def export(path: str):
+    # .prom and .txt files get the Prometheus text format, anything else JSON
+    text = to_prometheus() if path.endswith((".prom", ".txt")) else to_json()
+    with open(path, "w") as file:
+        file.write(text)
+
+
+@contextmanager
+def profile(mode: str = None, output: str = None):
+    mode = mode or os.environ.get("VIDEOGAMES_PROFILE", "")
+    output = output or os.environ.get("VIDEOGAMES_PROFILE_FILE")
+    if mode == "":
+        yield
+        return
+
+    if mode == "pyinstrument":
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            if output:
+                with open(output, "w") as file:
+                    file.write(profiler.output_html())
+            else:
+                print(profiler.output_text(unicode=True, color=False))
+        return
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        if output:
+            profiler.dump_stats(output)
+        else:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+if enabled and os.environ.get("VIDEOGAMES_METRICS_FILE"):
+    enable(os.environ["VIDEOGAMES_METRICS_FILE"])
@@ -1,5 +1,18 @@
+import concurrent.futures
+import re
+import sys
+import time
 import mysql.connector as mysql
 import pandas as pd
+import cache
+import dbhandling
+import metrics
+from dbpool import ConnectionPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
 
 queries: dict[str, dict[str, str]] = {
     "database": {
@@ -37,57 +50,68 @@ queries: dict[str, dict[str, str]] = {
                 rating,
                 times_listed,
                 number_of_reviews,
-                LEFT(summary, 30) AS truncated_summary,
+                SUBSTR(summary, 1, 30) AS truncated_summary,
                 plays,
                 playing,
                 backlogs,
                 wishlist
             FROM videogames
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Show the developers table": """
             SELECT *
             FROM developers
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Show the genre table": """
             SELECT *
             FROM genre
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
     },
     "videogames": {
         "Number of videogames per decade": """
             SELECT
-                CONCAT(LEFT(release_date, 3), '0s') AS decade,
+                CONCAT(release_decade, 's') AS decade,
                 COUNT(*) AS number_of_games
             FROM videogames
-            GROUP BY decade
-            ORDER BY decade;""",
+            GROUP BY release_decade
+            ORDER BY release_decade;""",
+        "Number of videogames per year": """
+            SELECT release_year, COUNT(*) AS number_of_games
+            FROM videogames
+            GROUP BY release_year
+            ORDER BY release_year;""",
+        "Top 10 videogames of the 2010s by rating": """
+            SELECT game_title, release_year, rating
+            FROM videogames
+            WHERE release_year BETWEEN %(first_year)s AND %(last_year)s
+            ORDER BY rating DESC
+            LIMIT %(limit)s;""",
         "Top 10 videogames by rating": """
             SELECT game_title, rating
             FROM videogames
             ORDER BY rating DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 10 most reviewed videogames (by registered reviews)": """
             SELECT v.game_title, COUNT(r.game_id) AS review_count
             FROM videogames v
             JOIN reviews r ON v.game_id = r.game_id
             GROUP BY v.game_title
             ORDER BY review_count DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 10 most played videogames": """
             SELECT game_title, plays
             FROM videogames
             ORDER BY plays DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 10 most wishlisted videogames": """
             SELECT game_title, wishlist
             FROM videogames
             ORDER BY wishlist DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 10 videogames by active players": """
             SELECT game_title, playing
             FROM videogames
             ORDER BY playing DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Videogames without reviews": """
             SELECT game_title
             FROM videogames
@@ -108,28 +132,29 @@ queries: dict[str, dict[str, str]] = {
             FROM developed_by
             GROUP BY developer
             ORDER BY num_of_games DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 10 developers by the average rating of their games": """
-            SELECT d.developer, AVG(v.rating) as avg_rating
-            FROM developed_by d
-            JOIN videogames v ON d.game_id = v.game_id
-            GROUP BY d.developer
+            SELECT developer, rating_sum / NULLIF(rating_count, 0) as avg_rating
+            FROM developer_stats
             ORDER BY avg_rating DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Top 5 developers with most reviews": """
-            SELECT d.developer, COUNT(r.game_id) as total_reviews
-            FROM developed_by d
-            JOIN reviews r ON d.game_id = r.game_id
-            GROUP BY d.developer
+            SELECT developer, num_reviews as total_reviews
+            FROM developer_stats
+            WHERE num_reviews > 0
             ORDER BY total_reviews DESC
-            LIMIT 10;""",
+            LIMIT %(limit)s;""",
         "Developers who have developed for more than 10 genres": """
-            SELECT d.developer, COUNT(DISTINCT gi.genre_name) as num_genres
-            FROM developed_by d
-            JOIN genre_is gi ON d.game_id = gi.game_id
-            GROUP BY d.developer
-            HAVING num_genres > 10
+            SELECT developer, num_genres
+            FROM developer_stats
+            WHERE num_genres > %(min_genres)s
             ORDER BY num_genres DESC;""",
+        "Videogames of a developer": """
+            SELECT v.game_title, v.release_date, v.rating
+            FROM developed_by d
+            JOIN videogames v ON v.game_id = d.game_id
+            WHERE d.developer = %(developer)s
+            ORDER BY v.release_date;""",
     },
     "genres": {
         "List of all genres": """
@@ -141,43 +166,717 @@ queries: dict[str, dict[str, str]] = {
             GROUP BY genre_name
             ORDER BY num_of_games DESC;""",
         "Average rating of games per genre": """
-            SELECT g.genre_name, AVG(v.rating) as avg_rating
-            FROM genre_is g
-            JOIN videogames v ON g.game_id = v.game_id
-            GROUP BY g.genre_name
+            SELECT genre_name, rating_sum / NULLIF(rating_count, 0) as avg_rating
+            FROM genre_stats
             ORDER BY avg_rating DESC;""",
         "Genres with the fewest videogames": """
             SELECT g.genre_name, COUNT(*) as num_of_games
             FROM genre_is g
             GROUP BY g.genre_name
             ORDER BY num_of_games ASC
-            LIMIT 5;""",
+            LIMIT %(limit)s;""",
+        "Top 10 videogames of a genre by rating": """
+            SELECT v.game_title, v.rating
+            FROM genre_is g
+            JOIN videogames v ON v.game_id = g.game_id
+            WHERE g.genre_name = %(genre)s
+            ORDER BY v.rating DESC
+            LIMIT %(limit)s;""",
+    },
+    # Every search query takes the user's terms as %(terms)s, matched in boolean mode and ranked by relevance
+    "search": {
+        "Videogames whose summary matches the terms": """
+            SELECT
+                game_title,
+                MATCH(summary) AGAINST (%(terms)s IN BOOLEAN MODE) AS relevance
+            FROM videogames
+            WHERE MATCH(summary) AGAINST (%(terms)s IN BOOLEAN MODE)
+            ORDER BY relevance DESC
+            LIMIT %(limit)s;""",
+        "Videogames whose reviews match the terms": """
+            SELECT
+                v.game_title,
+                COUNT(*) AS matching_reviews,
+                SUM(MATCH(r.content) AGAINST (%(terms)s IN BOOLEAN MODE)) AS relevance
+            FROM reviews r
+            JOIN videogames v ON v.game_id = r.game_id
+            WHERE MATCH(r.content) AGAINST (%(terms)s IN BOOLEAN MODE)
+            GROUP BY v.game_id, v.game_title
+            ORDER BY relevance DESC
+            LIMIT %(limit)s;""",
+        "Reviews that match the terms": """
+            SELECT
+                v.game_title,
+                LEFT(r.content, 80) AS excerpt,
+                MATCH(r.content) AGAINST (%(terms)s IN BOOLEAN MODE) AS relevance
+            FROM reviews r
+            JOIN videogames v ON v.game_id = r.game_id
+            WHERE MATCH(r.content) AGAINST (%(terms)s IN BOOLEAN MODE)
+            ORDER BY relevance DESC
+            LIMIT %(limit)s;""",
+    },
+    "performance": {
+        "Index usage of every catalog query": "EXPLAIN",
+        "Measured execution of every catalog query": "EXPLAIN ANALYZE",
+    },
+}
+categories = ["database", "videogames", "developers", "genres", "search", "performance"]
+
+# The compact schema keys developed_by and genre_is by integer ids, so queries reading names from them join back
+compact_queries: dict[str, dict[str, str]] = {
+    "developers": {
+        "Top 10 developers by number of developed games": """
+            SELECT dv.name AS developer, COUNT(*) as num_of_games
+            FROM developed_by db
+            JOIN developers dv ON dv.id = db.developer_id
+            GROUP BY dv.id, dv.name
+            ORDER BY num_of_games DESC
+            LIMIT %(limit)s;""",
+        "Videogames of a developer": """
+            SELECT v.game_title, v.release_date, v.rating
+            FROM developers dv
+            JOIN developed_by db ON db.developer_id = dv.id
+            JOIN videogames v ON v.game_id = db.game_id
+            WHERE dv.name = %(developer)s
+            ORDER BY v.release_date;""",
+    },
+    "genres": {
+        "Number of videogames per genre": """
+            SELECT gn.name AS genre_name, COUNT(*) as num_of_games
+            FROM genre_is gi
+            JOIN genre gn ON gn.id = gi.genre_id
+            GROUP BY gn.id, gn.name
+            ORDER BY num_of_games DESC;""",
+        "Genres with the fewest videogames": """
+            SELECT gn.name AS genre_name, COUNT(*) as num_of_games
+            FROM genre_is gi
+            JOIN genre gn ON gn.id = gi.genre_id
+            GROUP BY gn.id, gn.name
+            ORDER BY num_of_games ASC
+            LIMIT %(limit)s;""",
+        "Top 10 videogames of a genre by rating": """
+            SELECT v.game_title, v.rating
+            FROM genre gn
+            JOIN genre_is gi ON gi.genre_id = gn.id
+            JOIN videogames v ON v.game_id = gi.game_id
+            WHERE gn.name = %(genre)s
+            ORDER BY v.rating DESC
+            LIMIT %(limit)s;""",
+    },
+}
+
+# The embedded engine reads its own catalog tables, concatenates with || and divides integers as integers
+sqlite_queries: dict[str, dict[str, str]] = {
+    "database": {
+        "Total database size": """
+            SELECT
+                'popular_videogames' AS "Database Name",
+                page_count * page_size / (1024.0 * 1024) AS "Database Size (MB)"
+            FROM pragma_page_count(), pragma_page_size();""",
+        "Number of tables": """
+            SELECT COUNT(*) AS "Number of Tables"
+            FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%';""",
+        "Number of rows per table": """
+            SELECT m.name AS table_name, MAX(CAST(s.stat AS INTEGER)) AS table_rows
+            FROM sqlite_master m
+            LEFT JOIN sqlite_stat1 s ON s.tbl = m.name
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+            GROUP BY m.name;""",
+        "List tables in the database": """
+            SELECT name
+            FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+            ORDER BY name;""",
+        "Columns in each table": """
+            SELECT m.name AS table_name, GROUP_CONCAT(c.name) AS COLUMNS
+            FROM sqlite_master m
+            JOIN pragma_table_info(m.name) c
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+            GROUP BY m.name;""",
+        "Indexes information": """
+            SELECT m.name AS table_name, il.name AS index_name, ii.name AS column_name
+            FROM sqlite_master m
+            JOIN pragma_index_list(m.name) il
+            JOIN pragma_index_info(il.name) ii
+            WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%';""",
+    },
+    "videogames": {
+        "Number of videogames per decade": """
+            SELECT
+                release_decade || 's' AS decade,
+                COUNT(*) AS number_of_games
+            FROM videogames
+            GROUP BY release_decade
+            ORDER BY release_decade;""",
+    },
+    "developers": {
+        "Top 10 developers by the average rating of their games": """
+            SELECT developer, ROUND(CAST(rating_sum AS REAL) / NULLIF(rating_count, 0), 4) as avg_rating
+            FROM developer_stats
+            ORDER BY avg_rating DESC
+            LIMIT %(limit)s;""",
     },
+    "genres": {
+        "Average rating of games per genre": """
+            SELECT genre_name, ROUND(CAST(rating_sum AS REAL) / NULLIF(rating_count, 0), 4) as avg_rating
+            FROM genre_stats
+            ORDER BY avg_rating DESC;""",
+    },
+}
+# FULLTEXT search and the EXPLAIN output of the performance category only exist on the MySQL server
+mysql_only = {"search", "performance"}
+
+# name -> (type, default) of the values bound to each query's %(name)s placeholders; None means the user must give one
+top_10 = {"limit": (int, 10)}
+parameters: dict[str, dict[str, dict[str, tuple]]] = {
+    "database": {
+        "Show the videogames table": top_10,
+        "Show the developers table": top_10,
+        "Show the genre table": top_10,
+    },
+    "videogames": {
+        "Top 10 videogames of the 2010s by rating": {"first_year": (int, 2010), "last_year": (int, 2019), **top_10},
+        "Top 10 videogames by rating": top_10,
+        "Top 10 most reviewed videogames (by registered reviews)": top_10,
+        "Top 10 most played videogames": top_10,
+        "Top 10 most wishlisted videogames": top_10,
+        "Top 10 videogames by active players": top_10,
+    },
+    "developers": {
+        "Top 10 developers by number of developed games": top_10,
+        "Top 10 developers by the average rating of their games": top_10,
+        "Top 5 developers with most reviews": top_10,
+        "Developers who have developed for more than 10 genres": {"min_genres": (int, 10)},
+        "Videogames of a developer": {"developer": (str, "Nintendo")},
+    },
+    "genres": {
+        "Genres with the fewest videogames": {"limit": (int, 5)},
+        "Top 10 videogames of a genre by rating": {"genre": (str, "Adventure"), **top_10},
+    },
+    "search": {
+        "Videogames whose summary matches the terms": {"terms": (str, None), **top_10},
+        "Videogames whose reviews match the terms": {"terms": (str, None), **top_10},
+        "Reviews that match the terms": {"terms": (str, None), **top_10},
+    },
+}
+
+# Each summary table against the aggregation it replaces, compared without ORDER BY/LIMIT so ties can't differ
+rollup_checks: dict[str, tuple[str, str]] = {
+    "Games and average rating per genre": (
+        """
+            SELECT genre_name, num_games, rating_sum / NULLIF(rating_count, 0)
+            FROM genre_stats;""",
+        """
+            SELECT g.genre_name, COUNT(*), AVG(v.rating)
+            FROM genre_is g
+            JOIN videogames v ON g.game_id = v.game_id
+            GROUP BY g.genre_name;""",
+    ),
+    "Games and average rating per developer": (
+        """
+            SELECT developer, num_games, rating_sum / NULLIF(rating_count, 0)
+            FROM developer_stats;""",
+        """
+            SELECT d.developer, COUNT(*), AVG(v.rating)
+            FROM developed_by d
+            JOIN videogames v ON d.game_id = v.game_id
+            GROUP BY d.developer;""",
+    ),
+    "Reviews per developer": (
+        """
+            SELECT developer, num_reviews
+            FROM developer_stats
+            WHERE num_reviews > 0;""",
+        """
+            SELECT d.developer, COUNT(r.game_id)
+            FROM developed_by d
+            JOIN reviews r ON d.game_id = r.game_id
+            GROUP BY d.developer;""",
+    ),
+    "Genres per developer": (
+        """
+            SELECT developer, num_genres
+            FROM developer_stats
+            WHERE num_genres > 0;""",
+        """
+            SELECT d.developer, COUNT(DISTINCT gi.genre_name)
+            FROM developed_by d
+            JOIN genre_is gi ON d.game_id = gi.game_id
+            GROUP BY d.developer;""",
+    ),
+}
+
+
+# AVG() of integers is a double on SQLite, so the stored sums are divided as doubles too
+sqlite_rollup_checks: dict[str, str] = {
+    "Games and average rating per genre": """
+            SELECT genre_name, num_games, CAST(rating_sum AS REAL) / NULLIF(rating_count, 0)
+            FROM genre_stats;""",
+    "Games and average rating per developer": """
+            SELECT developer, num_games, CAST(rating_sum AS REAL) / NULLIF(rating_count, 0)
+            FROM developer_stats;""",
 }
-categories = ["database", "videogames", "developers", "genres"]
+
+
+compact_rollup_checks: dict[str, str] = {
+    "Games and average rating per genre": """
+            SELECT gn.name, COUNT(*), AVG(v.rating)
+            FROM genre_is gi
+            JOIN genre gn ON gn.id = gi.genre_id
+            JOIN videogames v ON gi.game_id = v.game_id
+            GROUP BY gn.id, gn.name;""",
+    "Games and average rating per developer": """
+            SELECT dv.name, COUNT(*), AVG(v.rating)
+            FROM developed_by db
+            JOIN developers dv ON dv.id = db.developer_id
+            JOIN videogames v ON db.game_id = v.game_id
+            GROUP BY dv.id, dv.name;""",
+    "Reviews per developer": """
+            SELECT dv.name, COUNT(r.game_id)
+            FROM developed_by db
+            JOIN developers dv ON dv.id = db.developer_id
+            JOIN reviews r ON db.game_id = r.game_id
+            GROUP BY dv.id, dv.name;""",
+    "Genres per developer": """
+            SELECT dv.name, COUNT(DISTINCT gi.genre_id)
+            FROM developed_by db
+            JOIN developers dv ON dv.id = db.developer_id
+            JOIN genre_is gi ON db.game_id = gi.game_id
+            GROUP BY dv.id, dv.name;""",
+}
+
+# (backend, database) -> (cache version, whether its tables were created with the compact schema)
+schema_modes = {}
+
+
+def compact_schema(pool: ConnectionPool) -> bool:
+    version = cache.results.current_version()
+    mode = schema_modes.get((pool.backend, pool.database))
+    if mode is None or mode[0] != version:
+        with pool.connection() as db_conn:
+            with db_conn.cursor() as cursor:
+                compact = dbhandling.compact_schema(cursor, pool.backend)
+        schema_modes[(pool.backend, pool.database)] = mode = (version, compact)
+    return mode[1]
+
+
+def check_backend(pool: ConnectionPool, category: str):
+    if pool.backend != "mysql" and category in mysql_only:
+        raise ValueError(f"The {category} queries need a MySQL server.")
+
+
+def sql_for(pool: ConnectionPool, category: str, query: str) -> str:
+    check_backend(pool, category)
+    if pool.backend == "sqlite" and query in sqlite_queries.get(category, {}):
+        return sqlite_queries[category][query]
+    if query in compact_queries.get(category, {}) and compact_schema(pool):
+        return compact_queries[category][query]
+    return queries[category][query]
+
+
+def available_categories(pool: ConnectionPool) -> list:
+    return [category for category in categories if pool.backend == "mysql" or category not in mysql_only]
 
 
 def query_categories() -> list:
     return categories
 
 
+def query_parameters(category: str, query: str) -> dict:
+    return parameters.get(category, {}).get(query, {})
+
+
+def resolve_params(category: str, query: str, params: dict = None) -> dict:
+    resolved = {}
+    for name, (kind, default) in query_parameters(category, query).items():
+        value = (params or {}).get(name, default)
+        if value is None:
+            raise ValueError(f"'{query}' needs a value for {name}.")
+        resolved[name] = kind(value)
+    return resolved
+
+
+# Named placeholders are rewritten once per SQL text, and the same string object is passed on every call,
+# because the connector only keeps a statement prepared while it is executed with the identical string
+positional_statements = {}
+
+
+def positional(sql: str) -> tuple:
+    statement = positional_statements.get(sql)
+    if statement is None:
+        names = tuple(re.findall(r"%\((\w+)\)s", sql))
+        statement = (re.sub(r"%\(\w+\)s", "%s", sql).strip().rstrip(";"), names)
+        positional_statements[sql] = statement
+    return statement
+
+
+def bind(pool: ConnectionPool, category: str, query: str, params: dict = None) -> tuple:
+    statement, names = positional(sql_for(pool, category, query))
+    resolved = resolve_params(category, query, params)
+    return statement, tuple(resolved[name] for name in names)
+
+
 def queries_inside(category: str) -> list:
     queries_list = list(queries[category].keys())
     queries_list.sort()
     return queries_list
 
 
-def execute_query(user: str, password: str, category: str, query: str):
+def summarize_explain(plan: list) -> dict:
+    tables = [step for step in plan if step["table"] is not None]
+    return {
+        "access": ", ".join(f"{step['table']}:{step['type']}" for step in tables),
+        "rows_examined": sum(step["rows"] or 0 for step in tables),
+        "uses_index": all(step["key"] is not None for step in tables),
+        "full_scan": any(step["type"] == "ALL" for step in tables),
+    }
+
+
+# Tree nodes that read a table, e.g. "-> Covering index lookup on g using PRIMARY (game_id=v.game_id)"
+access_node = re.compile(
+    r"-> ((?:Table scan|(?:Single-row )?(?:covering )?index (?:lookup|scan|range scan|skip scan)|Full-text index search)) "
+    r"on (\S+)",
+    re.IGNORECASE,
+)
+actual_rows = re.compile(r"actual time=[\d.]+\.\.([\d.]+) rows=([\d.]+) loops=(\d+)")
+
+
+def summarize_explain_analyze(tree: str) -> dict:
+    # Only the root line carries the totals for the whole statement
+    root = actual_rows.search(tree)
+    tables = []
+    for line in tree.splitlines():
+        node = access_node.search(line)
+        if node is None:
+            continue
+        # Nodes the executor never reached have no actual rows
+        actual = actual_rows.search(line)
+        examined = float(actual.group(2)) * int(actual.group(3)) if actual else 0.0
+        tables.append({"table": node.group(2), "type": node.group(1), "rows": examined})
+    return {
+        "access": ", ".join(f"{step['table']}:{step['type']}" for step in tables),
+        "time_ms": float(root.group(1)) if root else None,
+        "rows_returned": float(root.group(2)) if root else None,
+        "rows_examined": sum(step["rows"] for step in tables),
+        "uses_index": all(step["type"].lower() != "table scan" for step in tables),
+        "full_scan": any(step["type"].lower() == "table scan" for step in tables),
+    }
+
+
+def explain_catalog(pool: ConnectionPool, mode: str):
+    check_backend(pool, "performance")
+    report = []
+    with pool.connection() as db_conn:
+        with db_conn.cursor(dictionary=True) as cursor:
+            for category in categories:
+                if category == "performance":
+                    continue
+                for query in queries_inside(category):
+                    # Queries run with their default parameters, and those waiting for the user's input are skipped
+                    try:
+                        sql, values = bind(pool, category, query)
+                    except ValueError:
+                        continue
+                    # SHOW statements and the like have no plan
+                    if not sql.upper().startswith("SELECT"):
+                        continue
+                    try:
+                        cursor.execute(f"{mode} {sql}", values)
+                        plan = cursor.fetchall()
+                    except mysql.Error as err:
+                        report.append({"category": category, "query": query, "error": err.msg})
+                        continue
+                    if mode == "EXPLAIN":
+                        summary = summarize_explain(plan)
+                    else:
+                        summary = summarize_explain_analyze(next(iter(plan[0].values())))
+                    report.append({"category": category, "query": query, **summary})
+    print(pd.DataFrame(report).to_string(index=False))
+
+
+# Tables the "Show the ... table" queries can page through. Every sort key is unique or made unique by the primary key,
+# and backed by an index, so each page is an index seek from the last key seen instead of an OFFSET scan
+browse_tables: dict[str, dict] = {
+    "videogames": {
+        "columns": (
+            "game_id, game_title, release_date, rating, times_listed, number_of_reviews, "
+            "SUBSTR(summary, 1, 30) AS truncated_summary, plays, playing, backlogs, wishlist"
+        ),
+        "key": "game_id",
+        "orders": ["game_id", "game_title"],
+    },
+    "developers": {"columns": "*", "key": "name", "orders": ["name"]},
+    "genre": {"columns": "*", "key": "name", "orders": ["name"]},
+}
+browse_queries = {
+    "Show the videogames table": "videogames",
+    "Show the developers table": "developers",
+    "Show the genre table": "genre",
+}
+# One SQL string per table, order, direction and page side, so each stays prepared on the server
+browse_statements = {}
+
+
+def sort_keys(table: str, order: str) -> list:
+    key = browse_tables[table]["key"]
+    return [order] if order == key else [order, key]
+
+
+def browse_statement(table: str, order: str, descending: bool, side: str = None) -> str:
+    statement_key = (table, order, descending, side)
+    statement = browse_statements.get(statement_key)
+    if statement is None:
+        keys = sort_keys(table, order)
+        # Pages before the current one are read backwards and flipped afterwards
+        backwards = descending != (side == "before")
+        where = ""
+        if side is not None:
+            operator = "<" if backwards else ">"
+            where = f" WHERE ({', '.join(keys)}) {operator} ({', '.join(['%s'] * len(keys))})"
+        direction = " DESC" if backwards else ""
+        statement = (
+            f"SELECT {browse_tables[table]['columns']} FROM {table}{where} "
+            f"ORDER BY {', '.join(key + direction for key in keys)} LIMIT %s"
+        )
+        browse_statements[statement_key] = statement
+    return statement
+
+
+class TableBrowser:
+    def __init__(self, pool: ConnectionPool, table: str, order: str = None, descending: bool = False, page_size: int = 10):
+        if table not in browse_tables:
+            raise ValueError(f"{table} can't be browsed.")
+        order = order or browse_tables[table]["key"]
+        if order not in browse_tables[table]["orders"]:
+            raise ValueError(f"{table} can't be sorted by {order}.")
+        self.pool = pool
+        self.table = table
+        self.order = order
+        self.descending = descending
+        self.page_size = page_size
+        self.columns = []
+        self.rows = []
+        self.page = 0
+
+    def sort_key(self, row: tuple) -> tuple:
+        return tuple(row[self.columns.index(name)] for name in sort_keys(self.table, self.order))
+
+    def fetch(self, side: str = None, boundary: tuple = ()) -> list:
+        sql = browse_statement(self.table, self.order, self.descending, side)
+        with metrics.timer("query.browse", table=self.table):
+            with self.pool.connection() as db_conn:
+                cursor = self.pool.prepared_cursor(db_conn, sql)
+                cursor.execute(sql, (*boundary, self.page_size))
+                self.columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
+        return rows[::-1] if side == "before" else rows
+
+    def first(self) -> tuple:
+        self.rows = self.fetch()
+        self.page = 1
+        return self.columns, self.rows
+
+    def next(self) -> tuple:
+        # The last page stays on screen when nothing follows it
+        if self.rows:
+            rows = self.fetch("after", self.sort_key(self.rows[-1]))
+            if rows:
+                self.rows = rows
+                self.page += 1
+        return self.columns, self.rows
+
+    def previous(self) -> tuple:
+        if self.rows and self.page > 1:
+            rows = self.fetch("before", self.sort_key(self.rows[0]))
+            if rows:
+                self.rows = rows
+                self.page -= 1
+        return self.columns, self.rows
+
+
+def is_unbounded(category: str, query: str) -> bool:
+    return category != "performance" and "LIMIT" not in queries[category][query].upper()
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stream_query(
+    pool: ConnectionPool, category: str, query: str, chunk_size: int = 1000, params: dict = None, describe: bool = False
+):
+    sql, values = bind(pool, category, query, params)
+    with pool.connection() as db_conn:
+        # Prepared cursors are unbuffered, so rows stay on the server socket until fetchmany asks for them
+        cursor = pool.prepared_cursor(db_conn, sql)
+        cursor.execute(sql, values)
+        exhausted = False
+        try:
+            # The full description carries the column types exporters need
+            columns = cursor.description if describe else [desc[0] for desc in cursor.description]
+            rows = cursor.fetchmany(chunk_size)
+            yield columns, rows
+            while rows:
+                rows = cursor.fetchmany(chunk_size)
+                if rows:
+                    yield columns, rows
+            exhausted = True
+        finally:
+            # Stopping early must not leave unread rows on a pooled connection, and reading them in chunks keeps the
+            # memory bound even when most of a large result is left
+            while not exhausted:
+                exhausted = not cursor.fetchmany(chunk_size)
+
+
+def render_stream(chunks) -> tuple:
+    start = time.perf_counter()
+    first_row_seconds = None
+    total_rows = 0
+    for columns, rows in chunks:
+        if first_row_seconds is None:
+            first_row_seconds = time.perf_counter() - start
+        if rows or total_rows == 0:
+            print(pd.DataFrame(rows, columns=columns).to_string(index=False, header=total_rows == 0))
+        total_rows += len(rows)
+    return total_rows, first_row_seconds
+
+
+def fetch_query(pool: ConnectionPool, category: str, query: str, use_cache: bool = True, params: dict = None) -> tuple:
+    sql, values = bind(pool, category, query, params)
+    # The cache directory can be shared by every backend and database file a user runs against
+    key = (pool.backend, pool.database, category, query, values)
+    result = cache.results.get(key) if use_cache else None
+    if result is not None:
+        metrics.count("query.cache_hits", query=query)
+    else:
+        with pool.connection() as db_conn:
+            cursor = pool.prepared_cursor(db_conn, sql)
+            with metrics.timer("query.execute", query=query):
+                cursor.execute(sql, values)
+            with metrics.timer("query.fetch", query=query):
+                result = ([desc[0] for desc in cursor.description], cursor.fetchall())
+        if use_cache:
+            cache.results.put(key, *result)
+    return result
+
+
+def execute_query(
+    pool: ConnectionPool,
+    category: str,
+    query: str,
+    use_cache: bool = True,
+    stream: bool = False,
+    chunk_size: int = 1000,
+    params: dict = None,
+):
+    if category == "performance":
+        try:
+            explain_catalog(pool, queries[category][query])
+        except (mysql.Error, ValueError) as err:
+            print(f"Error: {err}")
+        return
+
+    if stream:
+        try:
+            with metrics.timer("query.stream", query=query):
+                total_rows, first_row_seconds = render_stream(stream_query(pool, category, query, chunk_size, params))
+        except (mysql.Error, ValueError) as err:
+            print(f"Error: {err}")
+            return
+        print(
+            f"\n{total_rows} row(s) streamed in chunks of {chunk_size}, first row after "
+            f"{first_row_seconds * 1000:.1f} ms, peak RSS {peak_rss_mb():.1f} MB."
+        )
+        return
+
+    try:
+        columns, rows = fetch_query(pool, category, query, use_cache, params)
+    except (mysql.Error, ValueError) as err:
+        print(f"Error: {err}")
+        return
+    with metrics.timer("query.render", query=query):
+        output = pd.DataFrame(rows, columns=columns)
+        print(output.to_string(index=False))
+
+
+def timed_fetch(pool: ConnectionPool, category: str, query: str, use_cache: bool) -> tuple:
+    start = time.perf_counter()
+    try:
+        columns, rows = fetch_query(pool, category, query, use_cache)
+    except (mysql.Error, ValueError) as err:
+        return None, str(err), time.perf_counter() - start
+    return columns, rows, time.perf_counter() - start
+
+
+def run_report(pool: ConnectionPool, report_categories: list = None, workers: int = None, use_cache: bool = True) -> list:
+    # Every query gets its own pooled connection, so the report takes about as long as its slowest query
+    report_categories = report_categories or [
+        category for category in available_categories(pool) if category != "performance"
+    ]
+    jobs = []
+    for category in report_categories:
+        for query in queries_inside(category):
+            # Queries waiting for the user's input can't be part of an unattended report
+            if any(default is None for _, default in query_parameters(category, query).values()):
+                continue
+            jobs.append((category, query))
+    if not jobs:
+        print("No query to run.")
+        return []
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or pool.size) as executor:
+        futures = [executor.submit(timed_fetch, pool, category, query, use_cache) for category, query in jobs]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+    metrics.record("query.report", wall_seconds, count=len(jobs))
+
+    report = []
+    for (category, query), (columns, rows, seconds) in zip(jobs, results):
+        print(f"\n--- {category}: {query} ({seconds * 1000:.1f} ms) ---")
+        if columns is None:
+            print(f"Error: {rows}")
+            report.append({"category": category, "query": query, "rows": None, "ms": seconds * 1000})
+            continue
+        print(pd.DataFrame(rows, columns=columns).to_string(index=False))
+        report.append({"category": category, "query": query, "rows": len(rows), "ms": seconds * 1000})
+
+    summary = pd.DataFrame(report).astype({"rows": "Int64"})
+    print("\n" + summary.to_string(index=False))
+    print(
+        f"\n{len(jobs)} query(ies) in {wall_seconds * 1000:.1f} ms on {workers or pool.size} connection(s); "
+        f"{summary['ms'].sum():.1f} ms one after another, slowest {summary['ms'].max():.1f} ms."
+    )
+    return report
+
+
+def check_rollups(pool: ConnectionPool) -> bool:
+    consistent = True
     try:
-        with mysql.connect(
-            host="localhost", user=user, passwd=password, database="popular_videogames"
-        ) as db_conn:
+        compact = compact_schema(pool)
+        with pool.connection() as db_conn:
             with db_conn.cursor() as cursor:
-                query = queries[category][query]
-                cursor.execute(query)
-                output = pd.DataFrame(
-                    cursor.fetchall(), columns=[desc[0] for desc in cursor.description]
-                )
-                print(output.to_string(index=False))
+                for check, (rollup_query, live_query) in rollup_checks.items():
+                    if compact:
+                        live_query = compact_rollup_checks[check]
+                    if pool.backend == "sqlite":
+                        rollup_query = sqlite_rollup_checks.get(check, rollup_query)
+                    cursor.execute(rollup_query)
+                    rollup_rows = set(cursor.fetchall())
+                    cursor.execute(live_query)
+                    live_rows = set(cursor.fetchall())
+                    mismatches = len(rollup_rows ^ live_rows)
+                    if mismatches:
+                        consistent = False
+                        print(f"{check}: {mismatches} row(s) differ from the live aggregation.")
+                    else:
+                        print(f"{check}: consistent ({len(live_rows)} row(s)).")
     except mysql.Error as err:
         print(f"Error: {err}")
+        return False
+    return consistent
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector as mysql
+from dbpool import collation_key
+
+DATABASE_PATH = "./popular_videogames.sqlite"
+
+
+class SQLiteCursor:
+    # Speaks the connector's %s placeholders and raises its errors, so callers don't care which engine runs
+    def __init__(self, cursor: sqlite3.Cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cursor.close()
+
+    def execute(self, operation: str, params: tuple = None):
+        try:
+            if params is None:
+                self.cursor.execute(operation)
+            else:
+                self.cursor.execute(operation.replace("%s", "?"), tuple(params))
+        except sqlite3.IntegrityError as err:
+            raise mysql.IntegrityError(msg=str(err)) from err
+        except sqlite3.Error as err:
+            raise mysql.Error(msg=str(err)) from err
+
+    def executemany(self, operation: str, seq_params: list):
+        try:
+            self.cursor.executemany(operation.replace("%s", "?"), seq_params)
+        except sqlite3.IntegrityError as err:
+            raise mysql.IntegrityError(msg=str(err)) from err
+        except sqlite3.Error as err:
+            raise mysql.Error(msg=str(err)) from err
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchmany(self, size: int):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def cursor(self, *args, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.connection.in_transaction
+
+    def is_connected(self) -> bool:
+        return True
+
+
+def unhex(value: str):
+    return None if value is None else bytes.fromhex(value)
+
+
+def sha1(value: str):
+    return None if value is None else hashlib.sha1(value.encode()).hexdigest()
+
+
+def ai_ci(left: str, right: str) -> int:
+    left, right = collation_key(left), collation_key(right)
+    return (left > right) - (left < right)
+
+
+class SQLitePool:
+    # Same interface as dbpool.ConnectionPool, over an embedded database file
+    backend = "sqlite"
+
+    def __init__(self, path: str = DATABASE_PATH, size: int = 5):
+        self.path = path
+        self.database = os.path.abspath(path)
+        self.size = size
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.checkouts = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+
+    def open(self) -> sqlite3.Connection:
+        start = time.perf_counter()
+        # Each connection is only ever used by the thread that checked it out
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA foreign_keys = ON")
+        # Readers don't wait for a writer, which the concurrent report relies on
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.create_function("SHA1", 1, sha1, deterministic=True)
+        connection.create_function("UNHEX", 1, unhex, deterministic=True)
+        # Names are keys, so they must match and group the way they do on the MySQL server
+        connection.create_collation("ai_ci", ai_ci)
+        self.connect_seconds = time.perf_counter() - start
+        with self.lock:
+            self.connects += 1
+        return connection
+
+    @contextmanager
+    def connection(self, database: bool = True):
+        with self.slots:
+            with self.lock:
+                connection = self.idle.pop() if self.idle else None
+                self.checkouts += 1
+            if connection is None:
+                connection = self.open()
+            try:
+                yield SQLiteConnection(connection)
+            finally:
+                if connection.in_transaction:
+                    connection.rollback()
+                with self.lock:
+                    self.idle.append(connection)
+
+    def prepared_cursor(self, db_conn: SQLiteConnection, sql: str) -> SQLiteCursor:
+        # sqlite3 already keeps compiled statements in a per-connection cache
+        return db_conn.cursor()
+
+    def forget_database(self):
+        with self.lock:
+            for connection in self.idle:
+                connection.close()
+            self.idle.clear()
+
+    def drop_database(self):
+        self.forget_database()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def stats(self) -> dict:
+        reused = self.checkouts - self.connects
+        return {
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "reused": max(reused, 0),
+            "saved_seconds": max(reused, 0) * self.connect_seconds,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(
+            f"SQLite connections: {stats['checkouts']} checkout(s), {stats['connects']} connect(s), "
+            f"{stats['reused']} reuse(s)."
+        )